@@ -0,0 +1,60 @@
+"""
+Evaluations per second for parsed @when / @conditional expressions,
+and updates per second for all of them in a shared network.
+"""
+
+import timeit
+from functools import partial
+
+from snips_skill.expr import Network, Parser
+
+EXPRESSIONS = (
+    "status/a > 20",
+    "status/a > 20 and status/b == 'on'",
+    "(status/a >= 18 and status/a < 24) or not status/c == 'away'",
+    "status/d ~= '^kitchen' and status/b != 'off' and status/e <= 5",
+)
+
+STATE = {
+    "status/a": "21.5",
+    "status/b": "on",
+    "status/c": "home",
+    "status/d": "kitchen/light",
+    "status/e": 3,
+}
+
+# The same state, with numeric payloads converted on arrival
+TYPED_STATE = {**STATE, "status/a": 21.5}
+
+NUMBER = 100_000
+
+
+def main() -> None:
+    parser = Parser()
+    print("%12s  %s" % ("evals/s", "expression"))
+    for text in EXPRESSIONS:
+        expr = parser.parse(text)
+        secs = timeit.timeit(partial(expr, STATE), number=NUMBER)
+        print("%12.0f  %s" % (NUMBER / secs, text))
+
+    network = Network()
+    exprs = [parser.parse(text) for text in EXPRESSIONS]
+    for expr in exprs:
+        network.add(expr)
+
+    def update(state: dict, values: list, topic: str) -> None:
+        for expr in network.update(values, state, topic):
+            network.evaluate(expr, values, state)
+
+    print("\n%12s  %12s  %s" % ("updates/s", "typed", "changed topic, %s" % network))
+    for topic in sorted(STATE):
+        rates = []
+        for state in (STATE, TYPED_STATE):
+            values: list = []
+            secs = timeit.timeit(partial(update, state, values, topic), number=NUMBER)
+            rates.append(NUMBER / secs)
+        print("%12.0f  %12.0f  %s" % (*rates, topic))
+
+
+if __name__ == "__main__":
+    main()
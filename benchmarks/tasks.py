@@ -0,0 +1,55 @@
+"""
+Micro-benchmark for the task queue:
+Time per add (re-arm), cancel and membership test
+for growing numbers of pending tasks.
+"""
+
+import logging
+import sys
+import timeit
+from datetime import timedelta
+from random import randrange
+
+from snips_skill.tasks import Tasks, now
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+OPS = 1_000
+
+
+def bench(size: int) -> tuple[float, float, float]:
+    "Average microseconds per add, cancel and membership test"
+    tasks = Tasks(daemon=True, log_level=logging.WARNING)
+    later = now() + timedelta(days=1)
+    tasks.addAll(
+        Tasks.Task(later + timedelta(seconds=n), "t%d" % n, print) for n in range(size)
+    )
+    ids = ["t%d" % randrange(size) for _n in range(OPS)]
+
+    def add():
+        for id in ids:
+            tasks.create(print, later, id)
+
+    def cancel():
+        for id in ids:
+            tasks.cancel(id)
+
+    def contains():
+        for id in ids:
+            _result = id in tasks
+
+    try:
+        return tuple(
+            1e6 * timeit.timeit(op, number=1) / OPS for op in (add, contains, cancel)
+        )
+    finally:
+        tasks.stop()
+
+
+def main() -> None:
+    print("%8s %10s %10s %10s" % ("tasks", "add µs", "in µs", "cancel µs"))
+    for size in SIZES if len(sys.argv) < 2 else map(int, sys.argv[1:]):
+        print("%8d %10.2f %10.2f %10.2f" % (size, *bench(size)))
+
+
+if __name__ == "__main__":
+    main()
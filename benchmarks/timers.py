@@ -0,0 +1,65 @@
+"""
+Compare the binary heap and the timing wheel as pending task queues:
+Time per push (re-arm), remove and expiry
+for growing numbers of pending timers.
+"""
+
+import sys
+import timeit
+from random import Random
+
+from snips_skill.tasks import TaskHeap, Tasks, TimingWheel
+
+SIZES = (1_000, 10_000, 100_000)
+OPS = 10_000
+SPAN = 600.0  # seconds
+
+
+def bench(queue, size: int) -> tuple[float, float, float]:
+    "Average microseconds per push, remove and expiry"
+    rnd = Random(size)
+    start = 1_000_000.0
+    timers = [
+        (start + rnd.uniform(0, SPAN), Tasks.Task(None, "t%d" % n, print))
+        for n in range(size)
+    ]
+    for key, task in timers:
+        queue.push(key, task, start)
+    ops = [timers[rnd.randrange(size)] for _n in range(OPS)]
+
+    def push():
+        for key, task in ops:
+            queue.push(key, task, start)
+
+    def remove():
+        for _key, task in ops:
+            queue.remove(task.id)
+
+    def expire():
+        now = start
+        while now < start + SPAN:
+            now += 0.1  # Worker wakeups
+            while queue.pop_due(now):
+                pass
+
+    results = [1e6 * timeit.timeit(op, number=1) / OPS for op in (push, remove)]
+    push()  # restore removed timers
+    results.append(1e6 * timeit.timeit(expire, number=1) / size)
+    return tuple(results)
+
+
+def main() -> None:
+    print(
+        "%8s %-12s %10s %10s %10s"
+        % ("timers", "queue", "push µs", "remove µs", "expire µs")
+    )
+    for size in SIZES if len(sys.argv) < 2 else map(int, sys.argv[1:]):
+        for queue in (TaskHeap, TimingWheel):
+            print(
+                "%8d %-12s %10.2f %10.2f %10.2f"
+                % (size, queue.__name__, *bench(queue(), size))
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from .exceptions import SnipsClarificationError, SnipsError
+from .history import History
 from .i18n import CONFIRMATIONS, get_translations
 from .log import LoggingMixin
 from .mqtt import CommandLineClient, MqttClient, topic
@@ -17,11 +18,12 @@ from .snips import (
     on_start_session,
 )
 from .state import StateAwareMixin, conditional, when
-from .tasks import Scheduler, cron, delay, now
+from .tasks import AsyncScheduler, Scheduler, cron, delay, now
 
 __version__ = "0.1.28"
 
 __all__ = (
+    "AsyncScheduler",
     "CommandLineClient",
     "conditional",
     "CONFIRMATIONS",
@@ -29,6 +31,7 @@ __all__ = (
     "debug_json",
     "delay",
     "get_translations",
+    "History",
     "intent",
     "LoggingMixin",
     "min_confidence",
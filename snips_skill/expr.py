@@ -1,17 +1,54 @@
+import os
+import pickle
 import re
+import sys
 from collections import namedtuple
+from functools import cache
+from pathlib import Path
+from types import FunctionType
+from typing import Any, Callable, Iterable
 
 import ply.lex as lex
 import ply.yacc as yacc
 
+# Term value that has not been evaluated yet
+UNKNOWN = object()
+
+# Values that can be compared without conversion, by target type
+NATIVE_TYPES = {float: (float, int, bool), str: (str,)}
+
+# Seconds by duration suffix
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def placeholders(text: str) -> set[str]:
+    "Names of `{name}` placeholders"
+    return set(re.findall(r"\{(\w+)\}", text))
+
+
+def substitute(text: str, values: dict[str, Any]) -> str:
+    "Replace `{name}` placeholders, leaving other braces alone"
+    for name, value in values.items():
+        text = text.replace("{%s}" % name, str(value))
+    return text
 
-class Parser:
-    "Parse very simple expressions into callable boolean conditions"
 
-    class Expr(namedtuple("Expr", "keys expr")):
+class Parser:
+    """Parse very simple expressions into callable boolean conditions.
+    Each expression is compiled into a single Python function.
+    Comparisons are also compiled separately as terms
+    of an already converted value,
+    to be shared by all expressions in a `Network`.
+    """
+
+    class Expr(
+        namedtuple("Expr", "keys expr text terms template", defaults=(None, (), None))
+    ):
         """
         Container for a callable boolean predicate
-        along with the topic names being evaluated
+        along with the topic names being evaluated,
+        the source text, the comparison terms,
+        and a format string to combine term values
         """
 
         last_state = None
@@ -24,8 +61,44 @@ class Parser:
         def __hash__(self):
             return hash(self.expr)
 
+        def bind(self, **values) -> "Parser.Expr":
+            """Substitute placeholders in topic names, e.g. `status/{room}/lux`.
+            The compiled code is shared, only the topic constants differ.
+            """
+            topics = {key: substitute(key, values) for key in self.keys}
+            namespace = {
+                name: topics.get(value, value) if type(value) is str else value
+                for name, value in self.expr.__globals__.items()
+            }
+            predicate = FunctionType(self.expr.__code__, namespace, "predicate")
+            predicate.__doc__ = text = substitute(self.text, values)
+            terms = tuple(
+                Parser.Term(
+                    (topics[term.topic],) + term.key[1:],
+                    topics[term.topic],
+                    term.cast,
+                    FunctionType(term.func.__code__, namespace, "term"),
+                    term.window,
+                )
+                for term in self.terms
+            )
+            return type(self)(
+                set(topics.values()), predicate, text, terms, self.template
+            )
+
+    class Code(namedtuple("Code", "keys source")):
+        "Intermediate result: Python source code with the topic names used"
+
+    class Term(namedtuple("Term", "key topic cast func window", defaults=(None,))):
+        """A single comparison on a topic value, converted by `cast`,
+        or on an aggregate `window` of topic values
+        """
+
     tokens = (
+        "AGGREGATE",
         "AND",
+        "COMMA",
+        "DURATION",
         "EQUAL",
         "GREATER_EQUAL",
         "GREATER",
@@ -43,6 +116,7 @@ class Parser:
     )
 
     t_AND = r"and"
+    t_COMMA = r","
     t_EQUAL = r"=="
     t_GREATER = r">"
     t_GREATER_EQUAL = r">="
@@ -54,11 +128,20 @@ class Parser:
     t_OR = r"or"
     t_REGEX_MATCH = r"~="
     t_RPAREN = r"\)"
-    t_TOPIC = r"[\w_-]+(/[\w_-]+)+"
+    t_TOPIC = r"[\w{}-]+(/[\w{}-]+)+"  # With optional {placeholders}
 
     # Ignored characters
     t_ignore = " \t\r\n"
 
+    def t_AGGREGATE(self, t):
+        r"(avg|changes|max|min)(?=\s*\()"
+        return t
+
+    def t_DURATION(self, t):
+        r"\d+(\.\d+)?[smhd]\b"
+        t.value = float(t.value[:-1]) * TIME_UNITS[t.value[-1]]
+        return t
+
     def t_NUMBER(self, t):
         r"(\+|-)?\d+(\.\d+)?"
         t.value = float(t.value)
@@ -102,59 +185,87 @@ class Parser:
     def p_expr_and(self, p):
         "expr : expr AND expr"
         lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(lhs.keys | rhs.keys, lambda s: lhs(s) and rhs(s))
+        p[0] = self.Code(lhs.keys | rhs.keys, f"({lhs.source} and {rhs.source})")
 
     def p_expr_or(self, p):
         "expr : expr OR expr"
         lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(lhs.keys | rhs.keys, lambda s: lhs(s) or rhs(s))
+        p[0] = self.Code(lhs.keys | rhs.keys, f"({lhs.source} or {rhs.source})")
 
     def p_expr_not(self, p):
         "expr : NOT expr"
         cond = p[2]
-        p[0] = self.Expr(cond.keys, lambda s: not cond(s))
+        p[0] = self.Code(cond.keys, f"(not {cond.source})")
 
     def p_expr_parenthesis(self, p):
         "expr : LPAREN expr RPAREN"
         p[0] = p[2]
 
+    def compare(self, topic: str, op: str, value: float | str) -> Code:
+        "Generate code to compare a topic value with a constant"
+        test = f"%s {op} {self.constant(value)}"
+        return self.term((topic, op, value), topic, type(value), test)
+
+    def term(self, key: tuple, topic: str, cast: type, test: str, window=None) -> Code:
+        """Register a comparison, return a placeholder for it.
+        :param test: Source code with a `%s` placeholder for the value
+        :param window: Aggregate function name, seconds and threshold, if any
+        """
+        if window:
+            func, seconds, _threshold = window
+            args = (self.constant(arg) for arg in (func, topic, seconds))
+            value = "s.aggregate(%s)" % ", ".join(args)
+        else:
+            value = f"{cast.__name__}(s[{self.constant(topic)}])"
+        self.terms.append((key, topic, cast, test % value, test % "v", window))
+        return self.Code({topic}, "{%d}" % (len(self.terms) - 1))
+
+    def p_window(self, p):
+        "window : AGGREGATE LPAREN TOPIC COMMA DURATION RPAREN"
+        p[0] = (p[1], p[3], p[5])
+
+    def p_term_window_compare_number(self, p):
+        """term : window LESS NUMBER
+        | window LESS_EQUAL NUMBER
+        | window GREATER_EQUAL NUMBER
+        | window GREATER NUMBER
+        | window EQUAL NUMBER
+        | window NOT_EQUAL NUMBER"""
+        func, topic, seconds = p[1]
+        op, value = p[2], p[3]
+        test = f"%s {op} {self.constant(value)}"
+        key = (topic, op, value, func, seconds)
+        p[0] = self.term(key, topic, float, test, (func, seconds, value))
+
     def p_term_topic_less_number(self, p):
         "term : TOPIC LESS NUMBER"
-        lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(set([lhs]), lambda s: float(s[lhs]) < rhs)
+        p[0] = self.compare(p[1], "<", p[3])
 
     def p_term_topic_less_equal_number(self, p):
         "term : TOPIC LESS_EQUAL NUMBER"
-        lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(set([lhs]), lambda s: float(s[lhs]) <= rhs)
+        p[0] = self.compare(p[1], "<=", p[3])
 
     def p_term_topic_greater_equal_number(self, p):
         "term : TOPIC GREATER_EQUAL NUMBER"
-        lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(set([lhs]), lambda s: float(s[lhs]) >= rhs)
+        p[0] = self.compare(p[1], ">=", p[3])
 
     def p_term_topic_greater_number(self, p):
         "term : TOPIC GREATER NUMBER"
-        lhs, rhs = p[1], p[3]
-        p[0] = self.Expr(set([lhs]), lambda s: float(s[lhs]) > rhs)
+        p[0] = self.compare(p[1], ">", p[3])
 
     def p_term_topic_equal_literal(self, p):
         "term : TOPIC EQUAL literal"
-        lhs, rhs = p[1], p[3]
-        cast = type(rhs)
-        p[0] = self.Expr(set([lhs]), lambda s: cast(s[lhs]) == rhs)
+        p[0] = self.compare(p[1], "==", p[3])
 
     def p_term_topic_not_equal_literal(self, p):
         "term : TOPIC NOT_EQUAL literal"
-        lhs, rhs = p[1], p[3]
-        cast = type(rhs)
-        p[0] = self.Expr(set([lhs]), lambda s: cast(s[lhs]) != rhs)
+        p[0] = self.compare(p[1], "!=", p[3])
 
     def p_term_topic_regex_match_string(self, p):
         "term : TOPIC REGEX_MATCH STRING"
         lhs, rhs = p[1], p[3]
-        pattern = re.compile(rhs)
-        p[0] = self.Expr(set([lhs]), lambda s: pattern.search(str(s[lhs])) is not None)
+        search = self.constant(re.compile(rhs).search)
+        p[0] = self.term((lhs, "~=", rhs), lhs, str, f"({search}(%s) is not None)")
 
     def p_literal(self, p):
         """literal : NUMBER
@@ -166,7 +277,185 @@ class Parser:
 
     def __init__(self, **kwargs):
         self.lexer = lex.lex(module=self)
-        self.parser = yacc.yacc(module=self, **kwargs)
-
-    def parse(self, text: str, **kwargs):
-        return self.parser.parse(text, lexer=self.lexer, **kwargs)
+        self.parser = self.build(**kwargs)
+        self.constants: dict[str, Any] = {}
+        self.terms: list[tuple] = []  # Key, topic, cast, sources and window
+        self.compiled: dict[str, tuple] = {}
+
+    @staticmethod
+    def table_cache() -> Path | None:
+        "Location of pickled parser tables, outside of the package directory"
+        cache_dir = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+        try:
+            cache_dir = cache_dir / "snips_skill"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return None
+        return cache_dir / ("parsetab-py%d%d.pickle" % sys.version_info[:2])
+
+    def build(self, **kwargs) -> yacc.LRParser:
+        "Load cached parser tables, or generate them if missing or outdated"
+        picklefile = self.table_cache()
+        kwargs.setdefault("debug", False)
+        kwargs.setdefault("write_tables", False)
+        if picklefile is not None:
+            kwargs.setdefault("picklefile", str(picklefile))
+        try:
+            return yacc.yacc(module=self, **kwargs)
+        except (EOFError, pickle.UnpicklingError):
+            # Truncated by a concurrent writer, start over
+            Path(kwargs["picklefile"]).unlink(missing_ok=True)
+            return yacc.yacc(module=self, **kwargs)
+
+    def constant(self, value: Any) -> str:
+        "Hoist a constant into the namespace of the generated function"
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def compile(self, text: str, **kwargs) -> tuple:
+        "Compile an expression into a predicate function and its terms"
+        self.constants, self.terms = {}, []
+        code = self.parser.parse(text, lexer=self.lexer, **kwargs)
+        namespace = dict(self.constants)
+        source = code.source.format(*(term[3] for term in self.terms))
+        exec(f"def predicate(s):\n    return {source}", namespace)
+
+        terms = []
+        for key, topic, cast, _inline, source, window in self.terms:
+            exec(f"def term(v):\n    return {source}", namespace)
+            terms.append(self.Term(key, topic, cast, namespace.pop("term"), window))
+        return code.keys, namespace["predicate"], tuple(terms), code.source
+
+    def parse(self, text: str, **kwargs) -> Expr:
+        "Parse and compile an expression, reusing the code of identical texts"
+        compiled = self.compiled.get(text)
+        if compiled is None or kwargs:
+            compiled = self.compiled[text] = self.compile(text, **kwargs)
+        keys, shared, terms, template = compiled
+
+        # Conditions are hashed by function, so each caller gets its own
+        predicate = FunctionType(shared.__code__, shared.__globals__, "predicate")
+        predicate.__doc__ = text
+        return self.Expr(set(keys), predicate, text, terms, template)
+
+
+@cache
+def get_parser() -> Parser:
+    "Shared expression parser, built on first use"
+    return Parser()
+
+
+class Failure:
+    "A failed term evaluation, the error is raised when the value is used"
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def __bool__(self):
+        raise self.error
+
+
+class Network:
+    """Shared evaluation network for expressions.
+    Each distinct comparison term is evaluated once when its topic changes.
+    Expressions are compiled into functions of the term values,
+    and only expressions with changed terms need to be evaluated again.
+    Term values are kept by the caller, one list per state.
+    """
+
+    def __init__(self):
+        self.slots: dict[tuple, int] = {}  # Term index by key
+        self.terms: list[Parser.Term] = []
+        self.by_topic: dict[str, list[int]] = {}  # Term indexes by topic
+        self.windows: dict[str, list[int]] = {}  # Aggregate term indexes by topic
+        self.dependents: list[list[Parser.Expr]] = []  # Expressions by term
+        self.rules: dict[Parser.Expr, tuple[int, tuple[int, ...], Callable]] = {}
+
+    def add(self, expr: Parser.Expr) -> None:
+        "Register an expression and share its terms"
+        if expr in self.rules:
+            return
+
+        slots = []
+        for term in expr.terms:
+            slot = self.slots.get(term.key)
+            if slot is None:
+                slot = self.slots[term.key] = len(self.terms)
+                self.terms.append(term)
+                self.by_topic.setdefault(term.topic, []).append(slot)
+                if term.window:
+                    self.windows.setdefault(term.topic, []).append(slot)
+                self.dependents.append([])
+            if slot not in slots:
+                self.dependents[slot].append(expr)
+            slots.append(slot)
+
+        # Term values are tested for truth, so that failures are raised
+        source = expr.template.format(*("v[%d]" % slot for slot in slots))
+        namespace = {}
+        exec(f"def rule(v):\n    return bool({source})", namespace)
+        self.rules[expr] = (len(self.rules), tuple(set(slots)), namespace["rule"])
+
+    def reserve(self, values: list) -> None:
+        "Make room for terms registered after the values were created"
+        if len(values) < len(self.terms):
+            values.extend([UNKNOWN] * (len(self.terms) - len(values)))
+
+    def check(self, slot: int, state: dict[str, Any]) -> Any:
+        "Evaluate a single term, converting the value only if needed"
+        term = self.terms[slot]
+        try:
+            if term.window:
+                value = state.aggregate(term.window[0], term.topic, term.window[1])
+            else:
+                value = state[term.topic]
+            if type(value) not in NATIVE_TYPES[term.cast]:
+                value = term.cast(value)
+            return term.func(value)
+        except Exception as e:
+            return Failure(e)
+
+    def update(
+        self, values: list, state: dict[str, Any], topic: str
+    ) -> list[Parser.Expr]:
+        """Evaluate the terms on a changed topic.
+        :param values: Term values, updated in place
+        :param state: Current values by topic
+        :return: Expressions with changed terms, in order of registration
+        """
+        return self.refresh(values, state, self.by_topic.get(topic, ()))
+
+    def refresh(
+        self, values: list, state: dict[str, Any], slots: Iterable[int]
+    ) -> list[Parser.Expr]:
+        "Evaluate the given terms, return expressions with changed terms"
+        self.reserve(values)
+        affected: dict[Parser.Expr, None] = {}
+        for slot in slots:
+            value = self.check(slot, state)
+            if value != values[slot]:
+                values[slot] = value
+                affected.update(dict.fromkeys(self.dependents[slot]))
+        if len(affected) < 2:
+            return list(affected)
+        return sorted(affected, key=lambda expr: self.rules[expr][0])
+
+    def evaluate(self, expr: Parser.Expr, values: list, state: dict[str, Any]):
+        "Evaluate an expression from its term values"
+        rule = self.rules.get(expr)
+        if rule is None:
+            return expr(state)
+
+        self.reserve(values)
+        _order, slots, func = rule
+        for slot in slots:
+            if values[slot] is UNKNOWN:
+                values[slot] = self.check(slot, state)
+        expr.last_state = func(values)
+        return expr.last_state
+
+    def __repr__(self) -> str:
+        return "Network(%d terms, %d expressions)" % (len(self.terms), len(self.rules))
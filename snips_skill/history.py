@@ -0,0 +1,255 @@
+import time
+from array import array
+from collections import deque
+from typing import Any, Iterable
+
+__all__ = ("AGGREGATES", "Average", "Changes", "History", "Maximum", "Minimum")
+
+
+class History(Iterable):
+    """A ring buffer of timestamped numeric values with fixed capacity.
+    Values are stored in `array('d')`, i.e. 16 bytes per entry
+    including the timestamp. The oldest values are overwritten when full.
+    """
+
+    def __init__(self, capacity: int = 256):
+        assert capacity > 0, "Capacity must be positive"
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.start = 0  # Index of the oldest entry
+        self.size = 0
+
+    def append(self, value: float, when: float | None = None) -> None:
+        "Add a value, by default with the current time"
+        pos = (self.start + self.size) % self.capacity
+        self.times[pos] = time.time() if when is None else when
+        self.values[pos] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        "Iterate over `(time, value)` pairs, oldest first"
+        for n in range(self.size):
+            pos = (self.start + n) % self.capacity
+            yield self.times[pos], self.values[pos]
+
+    def __repr__(self) -> str:
+        return "History(%d/%d)" % (self.size, self.capacity)
+
+    def since(self, when: float) -> int:
+        "Number of entries at or after the given time, by binary search"
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[(self.start + mid) % self.capacity] < when:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.size - lo
+
+    def last(self, n: int | None = None, seconds: float | None = None) -> list[float]:
+        """Get the latest values, oldest first.
+        :param n: Maximum number of values
+        :param seconds: Only values within this time window
+        """
+        count = self.size if n is None else min(n, self.size)
+        if seconds is not None:
+            count = min(count, self.since(time.time() - seconds))
+        first = (self.start + self.size - count) % self.capacity
+        end = first + count
+        if end <= self.capacity:
+            return self.values[first:end].tolist()
+        return (
+            self.values[first:].tolist() + self.values[: end - self.capacity].tolist()
+        )
+
+    def min(self, seconds: float | None = None) -> float | None:
+        "Minimum value, optionally within a time window"
+        values = self.last(seconds=seconds)
+        return min(values) if values else None
+
+    def max(self, seconds: float | None = None) -> float | None:
+        "Maximum value, optionally within a time window"
+        values = self.last(seconds=seconds)
+        return max(values) if values else None
+
+    def mean(self, seconds: float | None = None) -> float | None:
+        "Average value, optionally within a time window"
+        values = self.last(seconds=seconds)
+        return sum(values) / len(values) if values else None
+
+
+class Window:
+    """Base class for aggregates over a sliding time window.
+    Each value holds until the next one arrives.
+    Updates and queries take amortized constant time.
+    """
+
+    def __init__(self, seconds: float):
+        assert seconds > 0, "Window size must be positive"
+        self.seconds = seconds
+
+    def append(self, value: Any, when: float | None = None) -> None:
+        "Add a new value, by default at the current time"
+        raise NotImplementedError
+
+    def value(self, now: float | None = None) -> Any:
+        "Aggregate at a given time, by default now"
+        raise NotImplementedError
+
+    def next_change(self, threshold: float, now: float | None = None) -> float | None:
+        """Time after `now` when the aggregate may cross `threshold`
+        without new values, or `None` if it stays constant
+        """
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return "%s(%gs)" % (type(self).__name__, self.seconds)
+
+
+class Average(Window):
+    "Time-weighted average of numeric values"
+
+    def __init__(self, seconds: float):
+        super().__init__(seconds)
+        self.points: deque[tuple[float, float]] = deque()  # Time, value
+        self.area = 0.0  # Integral between the first and the last point
+
+    def append(self, value: Any, when: float | None = None) -> None:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        when = time.time() if when is None else when
+        if self.points:
+            last, previous = self.points[-1]
+            self.area += previous * (when - last)
+        self.points.append((when, value))
+        self.expire(when)
+
+    def expire(self, now: float) -> None:
+        "Drop points that ended before the window"
+        start, points = now - self.seconds, self.points
+        while len(points) > 1 and points[1][0] <= start:
+            when, value = points.popleft()
+            self.area -= value * (points[0][0] - when)
+
+    def value(self, now: float | None = None) -> float | None:
+        if not self.points:
+            return None
+        now = time.time() if now is None else now
+        self.expire(now)
+        (first, initial), (last, current) = self.points[0], self.points[-1]
+        start = max(first, now - self.seconds)
+        area = self.area + current * (now - last) - initial * (start - first)
+        return area / (now - start) if now > start else current
+
+    def next_change(self, threshold: float, now: float | None = None) -> float | None:
+        now = time.time() if now is None else now
+        self.expire(now)
+        if len(self.points) < 2:
+            return None
+        (first, initial), (second, _value) = self.points[0], self.points[1]
+        last, current = self.points[-1]
+
+        # The average is linear or hyperbolic in time until the next breakpoint
+        if now < first + self.seconds:  # The window starts at the first point
+            end = first + self.seconds
+            slope = current - threshold
+            offset = current * last - self.area - threshold * first
+        else:  # The first point slides out of the window
+            end = second + self.seconds
+            slope = current - initial
+            offset = (
+                (threshold - initial) * self.seconds
+                - self.area
+                + current * last
+                - initial * first
+            )
+        if slope:
+            crossing = offset / slope
+            if now < crossing < end:
+                return crossing
+        return end
+
+
+class Maximum(Window):
+    "Largest numeric value within the window"
+
+    def __init__(self, seconds: float):
+        super().__init__(seconds)
+        self.entries: deque[list] = deque()  # Dominant [value, end time]
+
+    def dominates(self, value: float, other: float) -> bool:
+        "Whether a new value makes an older one irrelevant"
+        return value >= other
+
+    def append(self, value: Any, when: float | None = None) -> None:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        when = time.time() if when is None else when
+        entries = self.entries
+        if entries:
+            entries[-1][1] = when  # The previous value ends now
+        while entries and self.dominates(value, entries[-1][0]):
+            entries.pop()
+        entries.append([value, None])
+
+    def value(self, now: float | None = None) -> float | None:
+        start = (time.time() if now is None else now) - self.seconds
+        entries = self.entries
+        while entries and entries[0][1] is not None and entries[0][1] <= start:
+            entries.popleft()
+        return entries[0][0] if entries else None
+
+    def next_change(self, threshold: float, now: float | None = None) -> float | None:
+        self.value(now)  # Drop expired entries
+        if not self.entries or self.entries[0][1] is None:
+            return None
+        return self.entries[0][1] + self.seconds
+
+
+class Minimum(Maximum):
+    "Smallest numeric value within the window"
+
+    def dominates(self, value: float, other: float) -> bool:
+        "Whether a new value makes an older one irrelevant"
+        return value <= other
+
+
+class Changes(Window):
+    "Number of value changes within the window"
+
+    def __init__(self, seconds: float):
+        super().__init__(seconds)
+        self.times: deque[float] = deque()
+
+    def append(self, value: Any, when: float | None = None) -> None:
+        self.times.append(time.time() if when is None else when)
+
+    def value(self, now: float | None = None) -> int:
+        start = (time.time() if now is None else now) - self.seconds
+        while self.times and self.times[0] <= start:
+            self.times.popleft()
+        return len(self.times)
+
+    def next_change(self, threshold: float, now: float | None = None) -> float | None:
+        self.value(now)  # Drop expired changes
+        return self.times[0] + self.seconds if self.times else None
+
+
+# Aggregate functions in expressions
+AGGREGATES: dict[str, type[Window]] = {
+    "avg": Average,
+    "changes": Changes,
+    "max": Maximum,
+    "min": Minimum,
+}
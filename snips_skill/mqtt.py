@@ -7,9 +7,12 @@ Simplistic wrapper for the Paho MQTT client.
 import json
 import logging
 import sys
+import threading
 from datetime import datetime
 from functools import wraps
 from getpass import getpass
+from operator import attrgetter
+from queue import Full, Queue
 from shutil import get_terminal_size
 from types import FunctionType
 from typing import Any, Callable, Tuple
@@ -21,7 +24,7 @@ from paho.mqtt.client import MQTTMessageInfo, MQTTv311
 from pydantic import BaseModel
 from typing_extensions import Self
 
-__all__ = ("MqttClient", "topic", "CommandLineClient", "decode_json")
+__all__ = ("MqttClient", "topic", "CommandLineClient", "decode_json", "Dispatcher")
 
 
 def decode_json(payload) -> Any:
@@ -32,6 +35,67 @@ def decode_json(payload) -> Any:
         return payload
 
 
+class Dispatcher:
+    """Run callbacks in a pool of worker threads.
+    Callbacks with the same key are executed in order by the same worker.
+    """
+
+    def __init__(
+        self, workers: int = 4, queue_size: int = 256, timeout: float | None = 1.0
+    ):
+        """
+        :param queue_size: Maximum number of pending callbacks per worker
+        :param timeout: Seconds to wait for a full queue before dropping
+            a callback, or `None` to wait indefinitely
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.timeout = timeout
+        self.dropped = 0
+        self.queues = [Queue(queue_size) for _n in range(workers)]
+        for n, queue in enumerate(self.queues):
+            threading.Thread(
+                target=self.work, args=(queue,), daemon=True, name=f"dispatch_{n}"
+            ).start()
+
+    def submit(self, key: Any, func: Callable, *args) -> None:
+        """Queue a callback for the worker of its key.
+        If the queue of that worker is full, wait up to `timeout` seconds
+        for a free slot, then drop the callback.
+        """
+        try:
+            self.queues[hash(key) % len(self.queues)].put(
+                (func, args), timeout=self.timeout
+            )
+        except Full:
+            self.dropped += 1
+            self.log.warning("Queue is full, dropping callback for: %s", key)
+
+    def work(self, queue: Queue) -> None:
+        "Worker thread main loop"
+        while True:
+            func, args = queue.get()
+            try:
+                func(*args)
+            except Exception:
+                self.log.exception("Error in callback: %s", func.__name__)
+
+    def __repr__(self) -> str:
+        return "Dispatcher(queued: %s, dropped: %d)" % (
+            "/".join(str(queue.qsize()) for queue in self.queues),
+            self.dropped,
+        )
+
+
+def session_key(msg) -> str:
+    "Dispatch key for Hermes messages: The session ID, or else the topic"
+    payload = msg.payload
+    if type(payload) is bytes:
+        payload = decode_json(payload)
+    if type(payload) is dict:
+        return payload.get("sessionId") or msg.topic
+    return msg.topic
+
+
 class MqttMessage(BaseModel):
     time: datetime
     topic: str
@@ -47,6 +111,16 @@ class MqttClient(PahoClient):
     DEFAULT_TLS_PORT = 8883
     SUBSCRIPTIONS: dict[str, Tuple[Callable, int]] = {}
 
+    # Dispatch keys for callbacks in worker threads
+    BY_TOPIC = "topic"  # Ordered per topic
+    BY_SESSION = "session"  # Ordered per Hermes session
+
+    dispatch_workers = 4
+    dispatch_queue_size = 256
+    dispatch_timeout: float | None = 1.0  # Seconds before dropping, if full
+    dispatcher: Dispatcher | None = None  # Created on demand
+    configured_client_id: str | None = None  # Unless generated per connection
+
     _tls_initialized: bool = False
     log: logging.Logger
 
@@ -61,6 +135,7 @@ class MqttClient(PahoClient):
         super(MqttClient, self).__init__(
             client_id, clean_session or not client_id, userdata, protocol, transport
         )
+        self.configured_client_id = client_id or None
         self._tls_initialized = False
         self.on_connect = MqttClient._on_connect
 
@@ -122,6 +197,14 @@ class MqttClient(PahoClient):
         except KeyboardInterrupt:
             self.log.info("Interrupted by user")
 
+    def dispatch(self, key: Any, func: Callable, *args) -> None:
+        "Run a callback in the worker pool"
+        if self.dispatcher is None:
+            self.dispatcher = Dispatcher(
+                self.dispatch_workers, self.dispatch_queue_size, self.dispatch_timeout
+            )
+        self.dispatcher.submit(key, func, *args)
+
     def subscribe(self, topic: str, qos: int = 0) -> Tuple:
         "Subscribe to a MQTT topic"
         result = super().subscribe(topic, qos)
@@ -147,6 +230,7 @@ def topic(
     qos: int = 0,
     payload_converter: Callable[[bytes], Any] | None = None,
     log_level: int = logging.NOTSET,
+    dispatch: str | Callable[[Any], Any] | None = None,
 ):
     """Decorator for callback functions.
     Callbacks are invoked with these positional parameters:
@@ -157,7 +241,14 @@ def topic(
     :param topic: MQTT topic, may contain wildcards
     :param qos: MQTT quality of service (default: 0)
     :param payload_converter: unary function to transform the message payload
+    :param dispatch: Run the callback in a worker thread instead of
+        the network thread, ordered by `MqttClient.BY_TOPIC`,
+        `MqttClient.BY_SESSION`, or by a key function of the message.
     """
+    if dispatch == MqttClient.BY_TOPIC:
+        dispatch = attrgetter("topic")
+    elif dispatch == MqttClient.BY_SESSION:
+        dispatch = session_key
 
     assert topic not in MqttClient.SUBSCRIPTIONS, (
         f"Topic '{topic}' is already registered"
@@ -174,9 +265,13 @@ def topic(
 
             # User-provided callback
             if type(method) is FunctionType:
-                return method(client, userdata, msg)
+                args = (client, userdata, msg)
             else:  # bound method
-                return method(userdata, msg)
+                args = (userdata, msg)
+            if dispatch:
+                client.dispatch(dispatch(msg), method, *args)
+            else:
+                return method(*args)
 
         MqttClient.SUBSCRIPTIONS[topic] = (wrapped, qos)
         return wrapped
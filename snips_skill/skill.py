@@ -69,13 +69,18 @@ class Skill(BaseCmd, LoggingMixin, SnipsClient):
 
 
 def intent(
-    intent: str, qos: int = 1, log_level: int = logging.NOTSET, silent: bool = False
+    intent: str,
+    qos: int = 1,
+    log_level: int = logging.NOTSET,
+    silent: bool = False,
+    dispatch=None,
 ):
     """Decorator for intent handlers.
     :param intent: Intent name.
     :param qos: MQTT quality of service.
     :param log_level: Log intents at this level, if set.
     :param silent: Set to `True` for intents that should return `None`
+    :param dispatch: Run the handler in a worker thread, see `topic`.
     The wrapped function gets a parsed `IntentPayload` object
     instead of a JSON `msg.payload`.
     If a `SnipsClarificationError` is raised, the session continues with a question.
@@ -83,7 +88,7 @@ def intent(
     """
 
     def wrapper(method):
-        @on_intent(intent, qos=qos, payload_converter=None)
+        @on_intent(intent, qos=qos, payload_converter=None, dispatch=dispatch)
         @wraps(method)
         def wrapped(client, userdata, msg):
             msg.payload = IntentPayload.model_validate_json(msg.payload)
@@ -75,12 +75,14 @@ class SnipsClient(MqttClient):
         transport=MqttClient.TCP,
         config: str = CONFIG,
     ):
+        configured_client_id = client_id
         if client_id is None:
             client_id = "snips-%s-%s" % (self.__class__.__name__.lower(), os.getpid())
 
         super(SnipsClient, self).__init__(
             client_id, clean_session, userdata, protocol, transport
         )
+        self.configured_client_id = configured_client_id  # Not the per-process ID
 
         self.log.debug("Loading config: %s", config)
         self.config = toml.load(config)
@@ -253,13 +255,18 @@ on_start_session = partial(
 
 
 def on_intent(
-    intent: str, qos: int = 0, payload_converter=_load_json, log_level=logging.NOTSET
+    intent: str,
+    qos: int = 0,
+    payload_converter=_load_json,
+    log_level=logging.NOTSET,
+    dispatch=None,
 ):
     return topic(
         f"{SnipsClient.INTENT_PREFIX}{intent}",
         qos=qos,
         payload_converter=payload_converter,
         log_level=log_level,
+        dispatch=dispatch,
     )
 
 
@@ -282,12 +289,15 @@ on_session_ended = partial(
 )
 
 
-def on_play_finished(site: str = "+", qos: int = 0, log_level=logging.NOTSET):
+def on_play_finished(
+    site: str = "+", qos: int = 0, log_level=logging.NOTSET, dispatch=None
+):
     return topic(
         SnipsClient.PLAY_FINISHED % site,
         qos=qos,
         payload_converter=_load_json,
         log_level=log_level,
+        dispatch=dispatch,
     )
 
 
@@ -1,15 +1,192 @@
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from functools import partial, wraps
+from itertools import product
 from pprint import pformat
 from signal import SIGUSR1, signal
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
-from paho.mqtt.client import MQTTMessageInfo
+from paho.mqtt.client import MQTT_ERR_SUCCESS, MQTTMessageInfo, topic_matches_sub
 
-from .expr import Parser
+from .expr import Network, Parser, get_parser, placeholders
+from .history import AGGREGATES, History, Window
 from .mqtt import decode_json, topic
 
-__all__ = ("StateAwareMixin", "conditional", "when")
+__all__ = (
+    "ConditionStats",
+    "PublishCache",
+    "StateAwareMixin",
+    "TypedState",
+    "conditional",
+    "when",
+)
+
+# Payload types that can be saved in snapshots
+JSON_TYPES = (bool, dict, float, int, list, str, type(None))
+
+# Templated condition, expanded for each combination of bound values
+Template = namedtuple("Template", "expr handler name bindings expanded")
+
+
+class ConditionStats:
+    "Evaluation statistics for a condition handler"
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.evaluations = self.invocations = 0
+        self.rising = self.falling = 0  # Transitions to true or false values
+        self.eval_time = self.handler_time = 0.0  # Cumulative seconds
+
+    def __repr__(self) -> str:
+        return (
+            "%d evaluations (%.3fs), %d rising, %d falling, %d invocations (%.3fs): %s"
+        ) % (
+            self.evaluations,
+            self.eval_time,
+            self.rising,
+            self.falling,
+            self.invocations,
+            self.handler_time,
+            self.expression,
+        )
+
+
+class PublishCache:
+    """Bounded LRU cache of published payloads by topic.
+    Identical payloads are suppressed until their time-to-live expires.
+    """
+
+    def __init__(
+        self, size: int = 1024, ttl: float = 60.0, ttls: dict[str, float] | None = None
+    ):
+        """
+        :param size: Maximum number of cached topics
+        :param ttl: Default time-to-live in seconds
+        :param ttls: Time-to-live by topic filter, 0 disables suppression
+        """
+        self.size = size
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.topic_ttls: dict[str, float] = {}  # Resolved by topic
+        self.entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.mutex = threading.Lock()
+        self.sent = self.suppressed = 0
+
+    def get_ttl(self, topic: str) -> float:
+        "Time-to-live for a topic"
+        ttl = self.topic_ttls.get(topic)
+        if ttl is None:
+            ttl = self.topic_ttls[topic] = next(
+                (t for sub, t in self.ttls.items() if topic_matches_sub(sub, topic)),
+                self.ttl,
+            )
+        return ttl
+
+    def check(self, topic: str, payload: Any) -> bool:
+        "Return `False` if a payload is a duplicate of the last one sent"
+        ttl = self.get_ttl(topic)
+        with self.mutex:
+            entry = self.entries.get(topic)
+            if ttl and entry and entry[0] == payload and entry[1] > time.monotonic():
+                self.suppressed += 1
+                return False
+            return True
+
+    def add(self, topic: str, payload: Any) -> None:
+        "Record a payload after it was sent"
+        ttl = self.get_ttl(topic)
+        with self.mutex:
+            self.sent += 1
+            self.entries[topic] = (payload, time.monotonic() + ttl)
+            self.entries.move_to_end(topic)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def __repr__(self) -> str:
+        return "PublishCache(%d/%d topics, sent: %d, suppressed: %d)" % (
+            len(self.entries),
+            self.size,
+            self.sent,
+            self.suppressed,
+        )
+
+
+class TypedState(dict):
+    """Last known values by topic.
+    Payloads of topics with a declared type are converted once on arrival,
+    so that conditions can compare them without further conversion.
+    Tracked topics also feed sliding window aggregates.
+    """
+
+    def __init__(self, types: dict[str, Callable] | None = None):
+        "Declare value types or converters by topic filter"
+        super().__init__()
+        self.types = types or {}
+        self.topic_types: dict[str, Callable | None] = {}  # Resolved by topic
+        self.windows: dict[tuple[str, str, float], Window] = {}
+        self.topic_windows: dict[str, list[Window]] = {}
+        self.mutex = threading.Lock()  # Windows change on updates and over time
+
+    def track(self, func: str, topic: str, seconds: float) -> Window:
+        "Start aggregating the values of a topic"
+        key = (func, topic, seconds)
+        with self.mutex:
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = AGGREGATES[func](seconds)
+                self.topic_windows.setdefault(topic, []).append(window)
+                if topic in self:
+                    window.append(self[topic])
+        return window
+
+    def record(self, topic: str, value: Any) -> None:
+        "Feed a changed value into the windows of its topic"
+        with self.mutex:
+            for window in self.topic_windows.get(topic, ()):
+                window.append(value)
+
+    def aggregate(self, func: str, topic: str, seconds: float) -> Any:
+        "Current value of a window aggregate"
+        window = self.windows.get((func, topic, seconds))
+        if window is None:
+            window = self.track(func, topic, seconds)
+        with self.mutex:
+            return window.value()
+
+    def next_change(
+        self, func: str, topic: str, seconds: float, threshold: float
+    ) -> float | None:
+        "Time when a window aggregate may cross a threshold without new values"
+        window = self.windows.get((func, topic, seconds))
+        if window is None:
+            return None
+        with self.mutex:
+            return window.next_change(threshold)
+
+    def get_type(self, topic: str) -> Callable | None:
+        "Declared type for a topic"
+        if topic in self.topic_types:
+            return self.topic_types[topic]
+        cast = self.topic_types[topic] = next(
+            (t for sub, t in self.types.items() if topic_matches_sub(sub, topic)),
+            None,
+        )
+        return cast
+
+    def convert(self, topic: str, payload: Any) -> Any:
+        "Convert a payload to the declared type of its topic, if possible"
+        cast = self.get_type(topic) if self.types else None
+        if cast is None or type(payload) is cast:
+            return payload
+        try:
+            return cast(payload)
+        except (TypeError, ValueError):
+            return payload
 
 
 class StateAwareMixin:
@@ -19,53 +196,325 @@ class StateAwareMixin:
     The message payload for status updates is JSON-converted if possible.
     The last known state is available in `self.current_state`.
     Subclasses may define handler methods using the @when decorator`.
+    All conditions share a `Network` of comparison terms,
+    so that only conditions with changed terms are evaluated.
+    Templated conditions are expanded for their bound values on startup.
+    With `conflate_updates`, status updates are processed in a worker thread,
+    and only the latest value per topic is kept while handlers are busy.
+    Payloads of topics matching `topic_types` are converted on arrival.
+    Numeric values of topics matching `history_topics` are recorded
+    in `self.history`.
+    With `narrow_subscriptions`, only topics used by conditions,
+    histories and `status_topics` are subscribed.
+    With a `state_snapshot_path`, the state and the last values of conditions
+    are saved periodically, and restored on startup.
+    With a `publish_cache_size`, identical payloads published to other topics
+    are suppressed within `publish_ttl` seconds.
+    Aggregate terms are re-checked on every message for their topic,
+    and in a worker thread when their values may change over time.
     """
 
     log: logging.Logger
     conditions: dict[Parser.Expr, Callable] = {}
-    expr_parser = Parser()
+    dependents: dict[str, list[Parser.Expr]] = {}  # Conditions by topic
+    network = Network()
+    templates: list[Template] = []
     update_log_level = logging.INFO
+    conflate_updates = False
+    history_topics: dict[str, int] = {}  # Capacity by topic filter
+    topic_types: dict[str, Callable] = {}  # Value types by topic filter
+    state_snapshot_path: str | None = None
+    state_snapshot_interval = 60.0  # seconds
+    window_check_delay = 0.01  # Seconds after an aggregate may change
+
+    # Outbound de-duplication, disabled by default
+    publish_cache_size = 0
+    publish_ttl = 60.0  # seconds
+    publish_ttls: dict[str, float] = {}  # Time-to-live by topic filter
+
+    # Subscribe only to topics used in conditions, histories and `status_topics`
+    narrow_subscriptions = False
+    status_topics: tuple[str, ...] = ()  # Other topics read by the skill
 
     def __init__(self, **kw):
         "Register topics and the state callcack."
 
         super(StateAwareMixin, self).__init__(**kw)
-        self.current_state = {}
+        self.current_state = TypedState(self.topic_types)
+        self.missing: dict[Parser.Expr, int] = {}  # Number of unknown keys
+        self.term_values: list = []  # By term index in the network
+        self.history: dict[str, History] = {}
+        self.history_capacity: dict[str, int] = {}  # Cached by topic
+        self.state_changed = False
+        self.raw_state: dict[str, tuple[bytes, Any]] = {}  # Payloads and values
+        self.condition_stats: dict[str, ConditionStats] = {}  # By handler name
+        self.evaluating = threading.RLock()  # Serialises terms and conditions
+        self.window_checks: dict[int, float] = {}  # Monotonic check time by term
+        self.windows_due = threading.Condition()
+        self.window_watcher: threading.Thread | None = None  # Started on demand
+        self.publish_cache = None
+        if self.publish_cache_size:
+            self.publish_cache = PublishCache(
+                self.publish_cache_size, self.publish_ttl, self.publish_ttls
+            )
 
         status_topic: str = self.get_config().get("status_topic")  # pyright: ignore[reportAttributeAccessIssue]
         assert status_topic, "status_topic not found in configuration"
+        self.expand_templates()
+        for term in self.network.terms:
+            if term.window:
+                self.current_state.track(term.window[0], term.topic, term.window[1])
 
         # Subscribe to status updates
-        register = topic(status_topic, payload_converter=decode_json)
-        register(self.update_status)
+        # Payloads are decoded in `update_status`, only when they change
+        for sub in self.status_subscriptions(status_topic):
+            register = topic(sub)
+            register(self.update_status)
 
         # Dump curent state on USR1 signal
         signal(SIGUSR1, self.dump_state)
 
+        if self.state_snapshot_path:
+            self.load_snapshot(self.state_snapshot_path)
+            threading.Thread(
+                target=self.save_snapshots, daemon=True, name="state_snapshots"
+            ).start()
+
+        if self.conflate_updates:
+            self.updates: dict[str, Any] = {}  # Latest queued payload by topic
+            self.updates_ready = threading.Condition()
+            self.conflated = 0
+            threading.Thread(
+                target=self.process_updates, daemon=True, name="status_updates"
+            ).start()
+
+    def status_subscriptions(self, status_topic: str) -> list[str]:
+        "Topic filters for status updates"
+        if not self.narrow_subscriptions:
+            return [status_topic]
+
+        topics = set(self.dependents) | set(self.history_topics)
+        topics.update(self.status_topics)
+        topics = sorted(t for t in topics if topic_matches_sub(status_topic, t))
+        self.log.debug("Subscribing to %d of %s", len(topics), status_topic)
+        return topics
+
     def update_status(self, _userdata, msg) -> None:
         """Track the global state,
         and invoke handler methods defined by subclasses
         with the message payload.
+        Raw payloads that are identical to the previous message on a topic
+        are not decoded again, and skipped unless histories are recorded
+        or the topic has aggregates.
+        """
+        payload = msg.payload
+        if type(payload) is bytes:
+            last = self.raw_state.get(msg.topic)
+            if last and last[0] == payload:
+                if not self.history_topics and msg.topic not in self.network.windows:
+                    return
+                payload = last[1]  # Recorded in order with other updates
+            else:
+                payload = decode_json(payload)
+                self.raw_state[msg.topic] = (msg.payload, payload)
+
+        if self.conflate_updates:
+            with self.updates_ready:
+                self.conflated += msg.topic in self.updates
+                self.updates[msg.topic] = payload
+                self.updates_ready.notify()
+        else:
+            if self.on_status_update(msg.topic, payload):
+                self.invoke_handlers(msg.topic, payload)
+            slots = self.network.windows.get(msg.topic)
+            if slots:  # Aggregates change with time, even for unchanged values
+                self.check_windows(slots)
+
+    def process_updates(self) -> None:
+        """Worker thread for conflated status updates.
+        Apply all queued updates to the state,
+        then invoke handlers for changed topics.
         """
-        if self.on_status_update(msg.topic, msg.payload):
-            self.invoke_handlers(msg.topic, msg.payload)
+        while True:
+            with self.updates_ready:
+                while not self.updates:
+                    self.updates_ready.wait()
+                updates, self.updates = self.updates, {}
+
+            changed = [
+                (key, payload)
+                for key, payload in updates.items()
+                if self.on_status_update(key, payload)
+            ]
+            for key, payload in changed:
+                try:
+                    self.invoke_handlers(key, payload)
+                except Exception:
+                    self.log.exception("Error in status handler for: %s", key)
+            for key in updates:
+                slots = self.network.windows.get(key)
+                if slots:
+                    try:
+                        self.check_windows(slots)
+                    except Exception:
+                        self.log.exception("Error in status handler for: %s", key)
 
     def on_status_update(self, topic: str, payload: Any) -> str | None:
         """Keep the global state in-memory.
         Returns a path to the updated attribute in `self.current_state`
         when the state has changed, or `None` otherwise.
         """
+        payload = self.current_state.convert(topic, payload)
+        if self.history_topics:
+            self.record(topic, payload)
+
         # Update only if the value has changed
         if self.current_state.get(topic) != payload:
+            self.state_changed = True
+            if topic not in self.current_state:
+                for expr in self.dependents.get(topic, ()):
+                    if expr in self.missing:
+                        self.missing[expr] -= 1
             self.current_state[topic] = payload
+            self.current_state.record(topic, payload)
             self.log.log(self.update_log_level, "Updated: %s = %s", topic, payload)
             return topic
 
+    def record(self, topic: str, payload: Any) -> None:
+        "Add numeric values to the topic history"
+        capacity = self.history_capacity.get(topic)
+        if capacity is None:
+            capacity = self.history_capacity[topic] = next(
+                (
+                    size
+                    for sub, size in self.history_topics.items()
+                    if topic_matches_sub(sub, topic)
+                ),
+                0,
+            )
+        if not capacity or type(payload) is bool:
+            return
+
+        try:
+            value = float(payload)
+        except (TypeError, ValueError):
+            return
+        history = self.history.get(topic)
+        if history is None:
+            history = self.history[topic] = History(capacity)
+        history.append(value)
+
     def invoke_handlers(self, topic: str, payload: Any) -> None:
-        "Run through conditions and invoke appropriate handlers"
-        for expr, method in self.conditions.items():
-            if topic in expr.keys and expr.keys <= self.current_state.keys():
-                method(self)
+        "Invoke handlers for conditions with changed terms and all keys known"
+        with self.evaluating:
+            self.invoke_conditions(
+                self.network.update(self.term_values, self.current_state, topic)
+            )
+
+    def invoke_conditions(self, exprs: list[Parser.Expr]) -> None:
+        "Invoke handlers for the given conditions, if all their keys are known"
+        with self.evaluating:
+            for expr in exprs:
+                missing = self.missing.get(expr)
+                if missing is None:
+                    missing = len(expr.keys - self.current_state.keys())
+                    self.missing[expr] = missing
+                if not missing:
+                    self.conditions[expr](self)
+
+    def check_windows(self, slots: list[int]) -> None:
+        """Re-check aggregate terms and invoke handlers for changed conditions.
+        Schedule the next check for when the aggregates may change over time.
+        """
+        with self.evaluating:
+            exprs = self.network.refresh(self.term_values, self.current_state, slots)
+            checks = {}
+            for slot in slots:
+                term = self.network.terms[slot]
+                func, seconds, threshold = term.window
+                checks[slot] = self.current_state.next_change(
+                    func, term.topic, seconds, threshold
+                )
+
+            # Windows use wall clock times, the schedule is monotonic
+            offset = time.monotonic() - time.time() + self.window_check_delay
+            with self.windows_due:
+                for slot, when in checks.items():
+                    if when is None:
+                        self.window_checks.pop(slot, None)
+                    else:
+                        self.window_checks[slot] = when + offset
+                if self.window_checks and self.window_watcher is None:
+                    self.window_watcher = threading.Thread(
+                        target=self.watch_windows, daemon=True, name="state_windows"
+                    )
+                    self.window_watcher.start()
+                self.windows_due.notify()
+            self.invoke_conditions(exprs)
+
+    def watch_windows(self) -> None:
+        "Worker thread to re-check aggregates when they may have changed"
+        while True:
+            with self.windows_due:
+                now = time.monotonic()
+                due = [slot for slot, when in self.window_checks.items() if when <= now]
+                if not due:
+                    wakeup = min(self.window_checks.values(), default=None)
+                    self.windows_due.wait(None if wakeup is None else wakeup - now)
+                    continue
+                for slot in due:
+                    del self.window_checks[slot]
+            try:
+                self.check_windows(due)
+            except Exception:
+                self.log.exception("Error in aggregate handlers")
+
+    @classmethod
+    def add_condition(cls, predicate: Parser.Expr, handler: Callable) -> None:
+        "Register a condition handler and index it by topic"
+        if predicate not in cls.conditions:
+            for key in predicate.keys:
+                cls.dependents.setdefault(key, []).append(predicate)
+            cls.network.add(predicate)
+        cls.conditions[predicate] = handler
+
+    @classmethod
+    def add_template(
+        cls,
+        template: Parser.Expr,
+        handler: Callable,
+        name: str,
+        bindings: dict[str, Any],
+    ) -> None:
+        """Register a condition with placeholders.
+        :param handler: Creates a handler for a bound expression
+        :param bindings: Values or callables returning values by placeholder
+        """
+        cls.templates.append(Template(template, handler, name, bindings, set()))
+
+    def expand_templates(self) -> None:
+        "Add conditions for bound values of templates, once per combination"
+        for template in self.templates:
+            choices = []
+            for values in template.bindings.values():
+                if callable(values):
+                    values = values(self)
+                if isinstance(values, str) or not isinstance(values, Iterable):
+                    values = (values,)  # A single value, not its characters
+                choices.append(values)
+            for combination in product(*choices):
+                if combination in template.expanded:
+                    continue
+                template.expanded.add(combination)
+                binding = dict(zip(template.bindings, combination))
+                predicate = template.expr.bind(**binding)
+                name = "%s(%s)" % (
+                    template.name,
+                    ", ".join("%s=%r" % item for item in binding.items()),
+                )
+                self.add_condition(
+                    predicate, template.handler(predicate, name, binding)
+                )
 
     def publish(
         self,
@@ -82,68 +531,196 @@ class StateAwareMixin:
                 return
 
             cast = type(old_state)
-            try:
-                if cast(payload) == old_state:
-                    return
-            except Exception:
-                pass
+            if type(payload) is not cast:
+                try:
+                    if cast(payload) == old_state:
+                        return
+                except (TypeError, ValueError):
+                    pass  # Not comparable, publish it
+        elif self.publish_cache:
+            if not self.publish_cache.check(topic, payload):
+                return
+            info = super().publish(topic, payload, qos, retain, log_level)  # pyright: ignore[reportAttributeAccessIssue]
+            if info.rc == MQTT_ERR_SUCCESS:  # Failures are not suppressed later
+                self.publish_cache.add(topic, payload)
+            return info
         return super().publish(topic, payload, qos, retain, log_level)  # pyright: ignore[reportAttributeAccessIssue]
 
+    def save_snapshot(self, path: str) -> None:
+        "Atomically write the state and condition values as JSON"
+        snapshot = {
+            "state": {
+                key: value
+                for key, value in list(self.current_state.items())
+                if type(value) in JSON_TYPES
+            },
+            "conditions": {
+                expr.text: expr.last_state
+                for expr in list(self.conditions)
+                if expr.text and type(expr.last_state) in JSON_TYPES
+            },
+        }
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load_snapshot(self, path: str) -> None:
+        "Restore the state and condition values, if a snapshot exists"
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            self.log.warning("Ignoring invalid state snapshot: %s", path)
+            return
+
+        for key, value in snapshot.get("state", {}).items():
+            self.current_state[key] = value = self.current_state.convert(key, value)
+            self.current_state.record(key, value)
+        self.missing.clear()
+        self.term_values.clear()
+        values = snapshot.get("conditions", {})
+        for expr in self.conditions:
+            if expr.text in values:
+                expr.last_state = values[expr.text]
+        self.log.info("Restored %d topics from: %s", len(self.current_state), path)
+
+    def save_snapshots(self) -> None:
+        "Periodically save state snapshots in a worker thread"
+        while True:
+            time.sleep(self.state_snapshot_interval)
+            if self.state_changed:
+                self.state_changed = False
+                try:
+                    self.save_snapshot(self.state_snapshot_path)  # pyright: ignore[reportArgumentType]
+                except Exception:
+                    self.log.exception("Cannot save state snapshot")
+
+    def evaluate(self, name: str, predicate: Parser.Expr) -> tuple[Any, Any]:
+        "Evaluate a condition, return its previous and current values"
+        stats = self.condition_stats.get(name)
+        if stats is None:
+            stats = self.condition_stats[name] = ConditionStats(predicate.text)
+
+        last_state = predicate.last_state
+        start = time.perf_counter()
+        try:
+            condition = self.network.evaluate(
+                predicate, self.term_values, self.current_state
+            )
+        finally:
+            stats.evaluations += 1
+            stats.eval_time += time.perf_counter() - start
+
+        if condition != last_state:
+            if condition:
+                stats.rising += 1
+            else:
+                stats.falling += 1
+        return last_state, condition
+
+    def run_handler(self, name: str, method: Callable, *args, **kw) -> None:
+        "Invoke a condition handler and record its run time"
+        start = time.perf_counter()
+        try:
+            method(self, *args, **kw)
+        finally:
+            stats = self.condition_stats[name]
+            stats.invocations += 1
+            stats.handler_time += time.perf_counter() - start
+
     def dump_state(self, _signal, _frame):
         "Print status information"
         print("Current state: " + pformat(self.current_state))
+        if self.publish_cache:
+            print(self.publish_cache)
+        print(self.network)
+        print(
+            "Conditions:\n"
+            + "\n".join(
+                "%s: %s" % (name, stats)
+                for name, stats in sorted(self.condition_stats.items())
+            )
+        )
+
 
+def register_condition(
+    predicate: Parser.Expr, handler: Callable, id: str, bindings
+) -> None:
+    "Add a condition, or a template if there are bindings"
+    unbound = set().union(*map(placeholders, predicate.keys)) - bindings.keys()
+    assert not unbound, "Unbound placeholders in %s: %s" % (
+        predicate.text,
+        ", ".join(sorted(unbound)),
+    )
+    if bindings:
+        StateAwareMixin.add_template(predicate, handler, id, bindings)
+    else:
+        StateAwareMixin.add_condition(predicate, handler(predicate, id, {}))
 
-def conditional(expression: str):
+
+def conditional(expression: str, **bindings):
     """Decorated a status handler method which is invoked
     with the value of the expression
     whenever the expression depends on an updated topic.
     For the expression grammar, see the docstrings in `expr.py`.
+    Placeholders in topics, e.g. `status/{room}/lux`, are bound to each
+    combination of values in `bindings`, which are passed to the handler
+    as keyword arguments. Callable values receive the client instance.
     """
 
-    predicate = StateAwareMixin.expr_parser.parse(expression)
+    predicate = get_parser().parse(expression)
 
     def wrapper(method):
-        id = method.func.__name__ if type(method) is partial else method.__name__
+        def handler(predicate: Parser.Expr, name: str, binding: dict[str, Any]):
+            @wraps(method)
+            def wrapped(self):
+                last_state, condition = self.evaluate(name, predicate)
+                if condition != last_state:
+                    self.log.info("Invoking: %s(%s)", name, condition)
+                    self.run_handler(name, method, condition, **binding)
 
-        @wraps(method)
-        def wrapped(self):
-            last_state = predicate.last_state
-            condition = predicate(self.current_state)
-            if condition != last_state:
-                self.log.info("Invoking: %s(%s)", id, condition)
-                method(self, condition)
+            return wrapped
 
-        StateAwareMixin.conditions[predicate] = wrapped
+        id = method.func.__name__ if type(method) is partial else method.__name__
+        register_condition(predicate, handler, id, bindings)
         return method
 
     return wrapper
 
 
-def when(expression: str):
+def when(expression: str, **bindings):
     """Decorate a status handler method which is invoked
     when the expression depends on an updated topic
     and when it evaluates to `True`.
     For the expression grammar, see the docstrings in `expr.py`.
+    Placeholders are bound as for `@conditional`.
     """
 
-    predicate = StateAwareMixin.expr_parser.parse(expression)
+    predicate = get_parser().parse(expression)
 
     def wrapper(method):
-        id = method.func.__name__ if type(method) is partial else method.__name__
+        def handler(predicate: Parser.Expr, name: str, binding: dict[str, Any]):
+            @wraps(method)
+            def wrapped(self):
+                last_state, condition = self.evaluate(name, predicate)
+                if condition != last_state:
+                    if condition:
+                        self.log.info("Invoking: %s", name)
+                        self.run_handler(name, method, **binding)
+                    else:
+                        self.log.debug("Skipping: %s", name)
 
-        @wraps(method)
-        def wrapped(self):
-            last_state = predicate.last_state
-            condition = predicate(self.current_state)
-            if condition != last_state:
-                if condition:
-                    self.log.info("Invoking: %s", id)
-                    method(self)
-                else:
-                    self.log.debug("Skipping: %s", id)
-
-        StateAwareMixin.conditions[predicate] = wrapped
+            return wrapped
+
+        id = method.func.__name__ if type(method) is partial else method.__name__
+        register_condition(predicate, handler, id, bindings)
         return method
 
     return wrapper
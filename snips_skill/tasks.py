@@ -1,18 +1,39 @@
+import asyncio
 import logging
 import os
+import sqlite3
 import threading
 import time
-from collections import namedtuple
+import zlib
+from bisect import bisect_left
+from collections import deque, namedtuple
 from datetime import datetime, timedelta
 from functools import partial, wraps
 from heapq import heapify, heappop, heappush
+from inspect import iscoroutine, iscoroutinefunction
+from itertools import count
+from math import ceil, floor
+from queue import Full, Queue
 from random import randint
 from signal import SIGUSR2, signal
-from typing import Callable, Iterable
+from typing import Callable, Container, Iterable, Iterator
 
 from croniter import croniter
 
-__all__ = ("cron", "delay", "now", "Scheduler")
+__all__ = (
+    "AsyncScheduler",
+    "AsyncTasks",
+    "cron",
+    "CronSchedule",
+    "delay",
+    "Executor",
+    "now",
+    "Scheduler",
+    "TaskHeap",
+    "TaskMetrics",
+    "TaskStore",
+    "TimingWheel",
+)
 
 
 def now() -> datetime:
@@ -20,157 +41,1280 @@ def now() -> datetime:
     return datetime.now().astimezone()
 
 
-class Tasks(Iterable):
-    "A synchronised priority queue of scheduled tasks"
+class Histogram:
+    "Counts of durations in exponential buckets"
 
-    class Task(namedtuple("Task", "when id func")):  # sorted by when
-        def __repr__(self):
-            return "Task(%s %s)" % (self.when, self.id)
+    BOUNDS = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0)  # Upper bounds in seconds
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # Last bucket is unbounded
+        self.total = self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> float:
+        count = self.count
+        return self.total / count if count else 0.0
+
+    def __repr__(self) -> str:
+        return "avg: %.3fs, max: %.3fs, buckets: %s" % (
+            self.mean,
+            self.max,
+            "/".join(map(str, self.counts)),
+        )
+
+
+class TaskStats:
+    "Execution statistics for a task ID"
+
+    def __init__(self):
+        self.count = self.failures = self.running = 0
+        self.skipped = self.hung = 0
+        self.lag = Histogram()  # Start time minus due time
+        self.duration = Histogram()
+
+    def __repr__(self) -> str:
+        return (
+            "%d runs, %d failed, %d running, %d skipped, %d hung, lag %s, duration %s"
+        ) % (
+            self.count,
+            self.failures,
+            self.running,
+            self.skipped,
+            self.hung,
+            self.lag,
+            self.duration,
+        )
+
+
+class TaskMetrics:
+    "Scheduling lag and execution time by task ID"
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.stats: dict[str, TaskStats] = {}
+
+    def _stats(self, id: str) -> TaskStats:
+        "Get or create the statistics for a task ID, with the mutex held"
+        stats = self.stats.get(id)
+        if stats is None:
+            stats = self.stats[id] = TaskStats()
+        return stats
+
+    def start(self, task, due: float | None = None) -> float:
+        """Record the start of a task, return a monotonic start time.
+        :param due: Monotonic deadline of the task, if known.
+            Otherwise, the lag is measured against its wall clock time.
+        """
+        start = time.monotonic()
+        if due is None:
+            lag = max(0.0, time.time() - task.when.timestamp())
+        else:
+            lag = max(0.0, start - due)
+        with self.mutex:
+            stats = self._stats(task.id)
+            stats.running += 1
+            stats.lag.add(lag)
+        return start
+
+    def finish(self, task, start: float, failed: bool = False) -> float:
+        "Record the end of a task, return its duration"
+        duration = time.monotonic() - start
+        with self.mutex:
+            stats = self.stats[task.id]
+            stats.running -= 1
+            stats.count += 1
+            stats.failures += failed
+            stats.duration.add(duration)
+        return duration
+
+    def skip(self, task) -> None:
+        "Record a task that was dropped because of its overlap policy"
+        with self.mutex:
+            self._stats(task.id).skipped += 1
+
+    def hang(self, task) -> None:
+        "Record a task that exceeded its timeout"
+        with self.mutex:
+            self._stats(task.id).hung += 1
+
+    @property
+    def running(self) -> list[str]:
+        "IDs of running tasks"
+        with self.mutex:
+            return [id for id, stats in self.stats.items() if stats.running]
+
+    def __getitem__(self, id: str) -> TaskStats:
+        return self.stats[id]
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.stats
+
+    def __iter__(self):
+        return iter(sorted(self.stats))
+
+    def __repr__(self) -> str:
+        with self.mutex:
+            return "--- Metrics:\n%s" % "\n".join(
+                "%s: %s" % (id, self.stats[id]) for id in sorted(self.stats)
+            )
+
+
+class HoldBack:
+    """Task IDs in flight, with tasks that are held back until they finish.
+    Implements the overlap policies of `Executor`.
+    Not synchronised, callers must serialise access.
+    """
+
+    def __init__(self, metrics: TaskMetrics, log: logging.Logger):
+        self.metrics = metrics
+        self.log = log
+        self.held: dict[str, deque] = {}
+
+    def admit(self, task, item) -> bool:
+        """Whether a task may start now, otherwise it is skipped or held back
+        :param item: Queue entry for the task, returned later by `release`.
+        """
+        if task.overlap == Executor.ALLOW_OVERLAP:
+            return True
+        held = self.held.get(task.id)
+        if held is None:
+            self.held[task.id] = deque()
+            return True
+        if task.overlap == Executor.SKIP_IF_RUNNING:
+            self.log.debug("Skipping task: %s", task.id)
+            self.metrics.skip(task)
+            return False
+        if held:  # Coalesce with the task that was held back
+            self.metrics.skip(held.popleft()[0])
+        self.log.debug("Holding back task: %s", task.id)
+        held.append(item)
+        return False
+
+    def release(self, task):
+        "Next entry held back for a finished task, or `None` if its ID is free"
+        if task.overlap == Executor.ALLOW_OVERLAP:
+            return None
+        held = self.held[task.id]
+        if held:
+            return held.popleft()
+        del self.held[task.id]
+
+    def drop(self, task) -> Iterable:
+        "Free the ID of a task that did not start, and return held-back entries"
+        if task.overlap == Executor.ALLOW_OVERLAP:
+            return ()
+        return self.held.pop(task.id)
+
+
+class Executor:
+    """A fixed-size thread pool for due tasks.
+    Unless a task allows overlap, tasks with the same ID never run concurrently:
+    While a task is queued or running, a later task with its ID is either
+    skipped, or held back and executed by the same worker afterwards.
+    """
+
+    # Overflow policies for a full queue
+    BLOCK = "block"  # Wait for a free queue slot
+    DISCARD = "discard"  # Drop the task
+    CALLER_RUNS = "caller_runs"  # Run the task in the submitting thread
+
+    # Overlap policies for tasks with the same ID
+    SKIP_IF_RUNNING = "skip_if_running"  # Drop the new task
+    QUEUE_ONE = "queue_one"  # Hold back the latest task only
+    ALLOW_OVERLAP = "allow_overlap"  # Run concurrently
 
     def __init__(
         self,
-        resolution: float = 0.1,
-        daemon: bool = False,
+        workers: int = 4,
+        queue_size: int = 64,
+        overflow: str = BLOCK,
         log_level: int = logging.INFO,
     ):
+        assert overflow in (self.BLOCK, self.DISCARD, self.CALLER_RUNS), (
+            f"Unknown overflow policy: {overflow}"
+        )
         self.log = logging.getLogger(self.__class__.__name__)
         self.log.setLevel(log_level)
+        self.overflow = overflow
+        self.queue: Queue = Queue(queue_size)
+        self.mutex = threading.Lock()
+        self.busy = 0
+        self.executed = self.discarded = 0
+        self.total_wait = self.max_wait = 0.0
+        self.metrics = TaskMetrics()
+        self.holdback = HoldBack(self.metrics, self.log)
+        # Running tasks with a timeout, as a heap of [deadline, seq, task, active]
+        self.timeouts: list[list] = []
+        self.sequence = count()
+        self.watched = threading.Condition(self.mutex)
+        self.watchdog: threading.Thread | None = None
+        self.stopping = False
+        self.workers = [
+            threading.Thread(target=self.work, daemon=True, name=f"executor_{n}")
+            for n in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, task, due: float | None = None) -> None:
+        """Queue a task for execution
+        :param due: Monotonic deadline of the task, for lag metrics.
+        """
+        item = (task, time.monotonic(), due)
+        with self.mutex:
+            if not self.holdback.admit(task, item):
+                return
+
+        try:
+            self.queue.put(item, block=self.overflow == self.BLOCK)
+        except Full:
+            if self.overflow == self.CALLER_RUNS:
+                self.run(*item)
+                return
+            with self.mutex:
+                self.discarded += 1
+                held = self.holdback.drop(task)
+            self.log.warning("Queue is full, discarding task: %s", task.id)
+            for task, _submitted, due in held:  # Re-submit held-back tasks, if any
+                self.submit(task, due)
+
+    def work(self) -> None:
+        "Worker thread main loop"
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.run(*item)
+
+    def run(self, task, submitted: float, due: float | None = None) -> None:
+        "Execute a task and then all tasks held back for its ID"
+        thread = threading.current_thread()
+        name = thread.name
+        thread.name = task.id
+        with self.mutex:
+            self.busy += 1
+
+        while True:
+            self.execute(task, submitted, due)
+            with self.mutex:
+                item = self.holdback.release(task)
+                if item is None:
+                    self.busy -= 1
+                    break
+            task, submitted, due = item
+
+        thread.name = name
+
+    def execute(self, task, submitted: float, due: float | None = None) -> None:
+        start = self.metrics.start(task, due)
+        wait = start - submitted
+        with self.mutex:
+            self.executed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        watch = None
+        if task.timeout:
+            watch = [start + task.timeout, next(self.sequence), task, True]
+            with self.mutex:
+                heappush(self.timeouts, watch)
+                if self.watchdog is None:
+                    self.watchdog = threading.Thread(
+                        target=self.watch, daemon=True, name="executor_watchdog"
+                    )
+                    self.watchdog.start()
+                elif self.timeouts[0] is watch:
+                    self.watched.notify()  # wake up earlier
+
+        self.log.debug("Executing task: %s", task.id)
+        try:
+            result = task.func()
+            if iscoroutine(result):
+                asyncio.run(result)
+            duration = self.metrics.finish(task, start)
+            self.log.debug("Task %s took %.2fs", task.id, duration)
+        except Exception:
+            self.metrics.finish(task, start, failed=True)
+            self.log.exception("Error in task: %s", task.id)
+        finally:
+            if watch:
+                with self.mutex:
+                    watch[-1] = False
+
+    def watch(self) -> None:
+        "Watchdog thread main loop, checks running tasks for timeouts"
+        while True:
+            with self.mutex:
+                while self.timeouts and not self.timeouts[0][-1]:
+                    heappop(self.timeouts)  # finished
+                if not self.timeouts:
+                    if self.stopping:
+                        self.watchdog = None
+                        return
+                    self.watched.wait()
+                    continue
+                timeout = self.timeouts[0][0] - time.monotonic()
+                if timeout > 0:
+                    self.watched.wait(timeout)
+                    continue
+                task = heappop(self.timeouts)[2]
+            self.hang(task)
+
+    def hang(self, task) -> None:
+        "Mark a task as hung after its timeout"
+        self.log.warning("Task %s is hung after %ss", task.id, task.timeout)
+        self.metrics.hang(task)
+
+    def shutdown(self) -> None:
+        "Stop the workers after the queued tasks"
+        for _worker in self.workers:
+            self.queue.put(None)
+        with self.mutex:
+            self.stopping = True
+            self.watched.notify()
+
+    def __repr__(self) -> str:
+        return (
+            "--- Executor: %d/%d busy, queue: %d/%d, "
+            "wait avg: %.3fs, max: %.3fs, executed: %d, discarded: %d"
+        ) % (
+            self.busy,
+            len(self.workers),
+            self.queue.qsize(),
+            self.queue.maxsize,
+            self.total_wait / self.executed if self.executed else 0.0,
+            self.max_wait,
+            self.executed,
+            self.discarded,
+        )
+
+
+class TaskHeap:
+    """Binary heap of pending tasks, ordered by a numeric key.
+    An ID index provides constant-time lookups. Cancelled entries stay in
+    the heap as tombstones until they reach the head, or until they
+    outnumber the live entries.
+    Not synchronised, see `Tasks`.
+    """
+
+    def __init__(self):
+        self.heap: list = []  # (key, seq, task) entries, including cancelled ones
+        self.index: dict[str, tuple] = {}  # Live heap entries by task ID
+        self.seq = count()  # Tie breaker for entries with equal keys
+
+    def push(self, key: float, task, now: float) -> bool:
+        """Add a task, replacing any task with the same ID.
+        Returns `True` if the head of the queue has changed.
+        """
+        entry = (key, next(self.seq), task)
+        old = self.index.get(task.id)
+        self.index[task.id] = entry
+        heappush(self.heap, entry)
+        head = self.heap[0] is entry or self.heap[0] is old
+        if old:
+            self._compact()
+        return head
+
+    def remove(self, id: str):
+        "Remove and return the task with the given ID, if any"
+        entry = self.index.pop(id, None)
+        if entry:
+            self._compact()
+            return entry[2]
+
+    def _compact(self) -> None:
+        "Drop tombstones when they outnumber live entries"
+        if len(self.heap) > 2 * len(self.index) + 64:
+            self.heap = list(self.index.values())
+            heapify(self.heap)
+
+    def _head(self) -> tuple | None:
+        "Get the first live heap entry"
+        while self.heap:
+            entry = self.heap[0]
+            if self.index.get(entry[2].id) is entry:
+                return entry
+            heappop(self.heap)  # cancelled
+
+    def next_key(self) -> float | None:
+        "Key of the next task"
+        entry = self._head()
+        return entry[0] if entry else None
+
+    def pop_due(self, now: float):
+        "Pop the next task if its key is not after `now`"
+        entry = self.pop_due_entry(now)
+        return entry[1] if entry else None
+
+    def pop_due_entry(self, now: float) -> tuple | None:
+        "Pop the next task and its key if the key is not after `now`"
+        entry = self._head()
+        if entry and entry[0] <= now:
+            heappop(self.heap)
+            del self.index[entry[2].id]
+            return entry[0], entry[2]
+
+    def get(self, id: str):
+        "Get a pending task by ID"
+        entry = self.index.get(id)
+        return entry[2] if entry else None
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self):
+        return iter([entry[2] for entry in list(self.index.values())])
+
+
+class TimingWheel:
+    """Hierarchical timing wheel for large numbers of pending tasks.
+    Each level has 256 slots, and each slot of a level spans
+    a full revolution of the level below. Inserting and cancelling tasks
+    takes constant time; tasks move down to finer levels as they get due.
+    Tasks fire at most `resolution` seconds after their key.
+    Not synchronised, see `Tasks`.
+    """
+
+    BITS = 8
+    SIZE = 1 << BITS
+    MASK = SIZE - 1
+    LEVELS = 4
+
+    def __init__(self, resolution: float = 0.01):
         self.resolution = resolution
-        self.tasks: list = []
+        # Slots map task IDs to (key, task)
+        self.wheels = [
+            [{} for _slot in range(self.SIZE)] for _level in range(self.LEVELS)
+        ]
+        self.occupied = [0] * self.LEVELS  # Bit masks of non-empty slots
+        self.due: dict = {}  # Expired tasks, in order
+        self.index: dict[str, tuple[dict, int, int]] = {}  # (slot, level, pos) by ID
+        self.current: int | None = None  # First unprocessed tick
+        self.wakeup: int | None = None  # Tick of the next event, if known
+
+    def push(self, key: float, task, now: float) -> bool:
+        """Add a task, replacing any task with the same ID.
+        Returns `True` if the next wakeup time has moved forward.
+        """
+        if self.current is None:
+            self.current = floor(now / self.resolution)
+        self.remove(task.id)
+        self._insert(key, task)
+        return self.wakeup is None or ceil(key / self.resolution) < self.wakeup
+
+    def _insert(self, key: float, task) -> None:
+        "Place a task in the wheel according to its distance from now"
+        assert self.current is not None
+        at = max(ceil(key / self.resolution), self.current)
+        delta = min(at - self.current, (1 << self.BITS * self.LEVELS) - 1)
+        level = 0
+        while delta >> self.BITS * (level + 1):
+            level += 1
+        at = self.current + delta  # clamped to the outermost revolution
+        pos = (at >> self.BITS * level) & self.MASK
+        slot = self.wheels[level][pos]
+        slot[task.id] = (key, task)
+        self.occupied[level] |= 1 << pos
+        self.index[task.id] = (slot, level, pos)
+
+    def remove(self, id: str):
+        "Remove and return the task with the given ID, if any"
+        location = self.index.pop(id, None)
+        if location is not None:
+            slot, level, pos = location
+            task = slot.pop(id)[1]
+            if not slot and level >= 0:
+                self.occupied[level] &= ~(1 << pos)
+            return task
+
+    def _next_tick(self) -> int | None:
+        "Find the next tick with expiring tasks or a cascade"
+        assert self.current is not None
+        result = None
+        for level, occupied in enumerate(self.occupied):
+            if not occupied:
+                continue
+            shift = self.BITS * level
+            base = self.current >> shift
+            # Upper levels cascade at slot boundaries
+            first = 1 if self.current & ((1 << shift) - 1) else 0
+            pos = (base + first) & self.MASK
+            rotated = (occupied >> pos | occupied << (self.SIZE - pos)) & (
+                (1 << self.SIZE) - 1
+            )
+            n = first + (rotated & -rotated).bit_length() - 1
+            tick = (base + n) << shift
+            if result is None or tick < result:
+                result = tick
+        return result
+
+    def _take(self, level: int, pos: int) -> list:
+        "Empty a slot and return its entries"
+        slot = self.wheels[level][pos]
+        entries = list(slot.items())
+        slot.clear()
+        self.occupied[level] &= ~(1 << pos)
+        return entries
+
+    def advance(self, now: float) -> None:
+        "Move all tasks with keys up to `now` to the due list"
+        if self.current is None:
+            return
+        target = floor(now / self.resolution)
+        while self.current <= target:
+            tick = self._next_tick()
+            if tick is None or tick > target:
+                self.current = target + 1
+                break
+
+            # Cascade upper levels at their slot boundaries
+            self.current = tick
+            for level in range(1, self.LEVELS):
+                shift = self.BITS * level
+                if tick & ((1 << shift) - 1):
+                    break
+                for _id, (key, task) in self._take(level, (tick >> shift) & self.MASK):
+                    self._insert(key, task)
+
+            entries = self._take(0, tick & self.MASK)
+            for id, entry in sorted(entries, key=lambda item: item[1][0]):
+                self.due[id] = entry
+                self.index[id] = (self.due, -1, 0)
+            self.current += 1
+
+    def next_key(self) -> float | None:
+        "Time of the next event, either a due task or a cascade"
+        if self.due:
+            return next(iter(self.due.values()))[0]
+        self.wakeup = self._next_tick() if self.current is not None else None
+        return None if self.wakeup is None else self.wakeup * self.resolution
+
+    def pop_due(self, now: float):
+        "Pop the next task if its key is not after `now`"
+        entry = self.pop_due_entry(now)
+        return entry[1] if entry else None
+
+    def pop_due_entry(self, now: float) -> tuple | None:
+        "Pop the next task and its key if the key is not after `now`"
+        self.advance(now)
+        if self.due:
+            id = next(iter(self.due))
+            del self.index[id]
+            return self.due.pop(id)
+
+    def get(self, id: str):
+        "Get a pending task by ID"
+        location = self.index.get(id)
+        return location[0][id][1] if location is not None else None
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self):
+        return iter([loc[0][id][1] for id, loc in list(self.index.items())])
+
+
+class TaskStore:
+    """Persistent storage for pending tasks and last run times in SQLite.
+    Only tasks with known IDs are saved, because functions cannot be stored.
+    """
+
+    def __init__(self, path: str, ids: Container[str] = ()):
+        """Open or create the database.
+        :param path: Database file name
+        :param ids: IDs of tasks that can be restored
+        """
+        self.ids = ids
         self.mutex = threading.Lock()
-        self.worker = threading.Thread(target=self.run, daemon=daemon, name="task_list")
-        self.worker.start()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS pending (id TEXT PRIMARY KEY, time REAL);
+            CREATE TABLE IF NOT EXISTS last_run (id TEXT PRIMARY KEY, time REAL);
+            """
+        )
+        # Saved times by task ID, to skip redundant writes
+        self.saved: dict[str, float] = dict(
+            self.db.execute("SELECT id, time FROM pending")
+        )
 
-    def add(self, value: Task) -> None:
-        "Add a task to the queue"
-        self.cancel(value.id)
-        with self.mutex:
-            heappush(self.tasks, value)
-            self.log.debug(
-                "Added task (%d/%d): %s",
-                self.tasks.index(value) + 1,
-                len(self.tasks),
-                value,
+    def pending(self) -> list[tuple[str, datetime]]:
+        "List saved tasks with their due times"
+        with self.mutex:
+            return [
+                (id, datetime.fromtimestamp(time).astimezone())
+                for id, time in self.saved.items()
+            ]
+
+    def save(self, task) -> None:
+        "Save a pending task, if its ID is known"
+        if task.id not in self.ids:
+            return
+        time = task.when.timestamp()
+        with self.mutex:
+            if self.saved.get(task.id) != time:
+                self.saved[task.id] = time
+                self.db.execute(
+                    "INSERT OR REPLACE INTO pending VALUES (?, ?)", (task.id, time)
+                )
+
+    def delete(self, id: str) -> None:
+        "Forget a pending task"
+        with self.mutex:
+            if self.saved.pop(id, None) is not None:
+                self.db.execute("DELETE FROM pending WHERE id = ?", (id,))
+
+    def last_run(self, id: str) -> datetime | None:
+        "Get the last time when a task was run"
+        with self.mutex:
+            row = self.db.execute(
+                "SELECT time FROM last_run WHERE id = ?", (id,)
+            ).fetchone()
+        return datetime.fromtimestamp(row[0]).astimezone() if row else None
+
+    def set_last_run(self, id: str, when: datetime) -> None:
+        "Record the time when a task was run"
+        with self.mutex:
+            self.db.execute(
+                "INSERT OR REPLACE INTO last_run VALUES (?, ?)", (id, when.timestamp())
             )
 
+    def close(self) -> None:
+        with self.mutex:
+            self.db.close()
+
+
+class BaseTasks(Iterable):
+    "Common interface of scheduled tasks"
+
+    class Task(
+        namedtuple(
+            "Task",
+            "when id func overlap timeout",
+            defaults=(Executor.QUEUE_ONE, None),
+        )
+    ):  # sorted by when
+        def __repr__(self):
+            return "Task(%s %s)" % (self.when, self.id)
+
+    metrics: TaskMetrics
+
+    def add(self, value: Task) -> None:
+        "Add a task, replacing any task with the same ID"
+        raise NotImplementedError
+
     def create(
-        self, func: Callable, when: datetime | None = None, id: str | None = None
+        self,
+        func: Callable,
+        when: datetime | None = None,
+        id: str | None = None,
+        overlap: str = Executor.QUEUE_ONE,
+        timeout: float | None = None,
     ) -> None:
-        "Add a task from parameters"
-        self.add(self.Task(when or now(), id or func.__name__, func))
+        """Add a task from parameters.
+        :param overlap: Policy for tasks with the same ID that are still running,
+            one of `Executor.SKIP_IF_RUNNING`, `Executor.QUEUE_ONE`
+            or `Executor.ALLOW_OVERLAP`.
+        :param timeout: Seconds after which a running task is marked as hung.
+        """
+        assert overlap in (
+            Executor.SKIP_IF_RUNNING,
+            Executor.QUEUE_ONE,
+            Executor.ALLOW_OVERLAP,
+        ), f"Unknown overlap policy: {overlap}"
+        self.add(self.Task(when or now(), id or func.__name__, func, overlap, timeout))
 
     def addAll(self, tasks: Iterable[Task]) -> None:
         "Add all tasks from an iterable"
         for task in tasks:
             self.add(task)
 
-    def __len__(self) -> int:
-        "Number of tasks in the queue"
-        return len(self.tasks)
+    def cancel(self, id: str) -> None:
+        "Remove the task with the given ID"
+        raise NotImplementedError
 
-    def __contains__(self, element: object) -> bool:
-        "Membership test"
-        if type(element) is str:
-            return any(task.id == element for task in self.tasks)
-        return element in self.tasks
+    def stop(self) -> None:
+        "Stop executing tasks"
+        raise NotImplementedError
+
+    def summary(self) -> str:
+        "Headline for `repr`"
+        return "%d Tasks" % len(self)
+
+    def reports(self) -> tuple:
+        "Statistics for `repr`"
+        return (self.metrics,)
 
     def __repr__(self) -> str:
-        return "--- %d Tasks:\n%s" % (
-            len(self),
+        return "--- %s:\n%s\n%s" % (
+            self.summary(),
             "\n".join(
                 "%2d: %s" % (n + 1, t)
-                for n, t in enumerate(sorted(self.tasks, key=lambda t: (t.when, t.id)))
+                for n, t in enumerate(sorted(self, key=lambda t: (t.when, t.id)))
             ),
+            "\n".join(map(str, self.reports())),
         )
 
+
+class Tasks(BaseTasks):
+    "A synchronised priority queue of scheduled tasks"
+
+    Task = BaseTasks.Task
+
+    def __init__(
+        self,
+        resolution: float | None = None,
+        daemon: bool = False,
+        log_level: int = logging.INFO,
+        executor: Executor | None = None,
+        queue: Callable = TaskHeap,
+        store: "TaskStore | None" = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Start the worker thread.
+        Due times are converted to deadlines on `clock` when tasks are added,
+        so that later wall clock adjustments do not affect pending tasks.
+        :param resolution: Optional upper bound for idle sleeps, in seconds.
+            By default, the worker sleeps until the next task is due,
+            or until the head of the queue changes.
+        :param executor: Thread pool for due tasks, with default settings if unset.
+        :param queue: Factory for the pending task queue,
+            either `TaskHeap` or `TimingWheel`.
+        :param store: Optional persistent storage for pending tasks.
+        :param clock: Monotonic time source in seconds, for testing.
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.log.setLevel(log_level)
+        self.resolution = resolution
+        self.executor = executor or Executor(log_level=log_level)
+        self.queue = queue()
+        self.store = store
+        self.metrics = self.executor.metrics
+        self.clock = clock
+        self.mutex = threading.Lock()
+        self.changed = threading.Condition(self.mutex)
+        self.running = True
+        self.worker = threading.Thread(target=self.run, daemon=daemon, name="task_list")
+        self.worker.start()
+
+    def deadline(self, when: datetime) -> float:
+        "Convert a wall clock time to a queue key"
+        return self.clock() + (when - now()).total_seconds()
+
+    def add(self, value: Task) -> None:
+        "Add a task to the queue, replacing any task with the same ID"
+        key = self.deadline(value.when)
+        with self.mutex:
+            if self.store:  # Before the worker can pop and delete it
+                self.store.save(value)
+            if self.queue.push(key, value, self.clock()):
+                self.changed.notify()  # wake up earlier
+            self.log.debug("Added task (%d pending): %s", len(self.queue), value)
+
+    def __len__(self) -> int:
+        "Number of tasks in the queue"
+        return len(self.queue)
+
+    def __contains__(self, element: object) -> bool:
+        "Membership test"
+        with self.mutex:  # The worker may be moving tasks in the queue
+            if type(element) is str:
+                return element in self.queue
+            task = self.queue.get(getattr(element, "id", None))
+        return task is not None and task == element
+
+    def reports(self) -> tuple:
+        return (self.executor, self.metrics)
+
     def __iter__(self):
-        return self.tasks.__iter__()
+        with self.mutex:
+            return iter(list(self.queue))
 
     def cancel(self, id: str) -> None:
-        "Remove all tasks with the given ID"
-        if id not in self:
-            return
+        "Remove the task with the given ID"
         with self.mutex:
-            for pos in reversed(
-                list(p for p, t in enumerate(self.tasks) if t.id == id)
-            ):
-                task = self.tasks[pos]
-                del self.tasks[pos]
-                self.log.debug(
-                    "Removed task: (%d/%d) %s", pos + 1, len(self.tasks) + 1, task
-                )
-            heapify(self.tasks)
+            task = self.queue.remove(id)
+            if task:
+                self.log.debug("Removed task (%d pending): %s", len(self.queue), task)
+                if self.store:
+                    self.store.delete(id)
+                self.changed.notify()  # re-check the head of the queue
 
     def next(self) -> Task | None:
         "Pop the next available task from the queue"
-        if not self.tasks:
+        if not self.queue:
             return
         with self.mutex:
-            if self.tasks[0].when <= now():
-                return heappop(self.tasks)
+            entry = self._pop_due()
+        return entry[1] if entry else None
+
+    def _pop_due(self) -> tuple[float, Task] | None:
+        "Pop the head of the queue and its key if it is due, with the mutex held"
+        entry = self.queue.pop_due_entry(self.clock())
+        if entry and self.store:
+            self.store.delete(entry[1].id)
+        return entry
+
+    def _timeout(self) -> float | None:
+        "Seconds until the head of the queue is due, with the mutex held"
+        key = self.queue.next_key()
+        if key is None:
+            return self.resolution
+        timeout = max(0.0, key - self.clock())
+        if self.resolution is not None:
+            return min(timeout, self.resolution)
+        return timeout
 
     def run(self) -> None:
         "Execute pending tasks"
         self.log.debug("Starting tasks...")
-        self.running = True
 
         while self.running:
-            task = self.next()
-            if task:
-                self.execute(task)
-            else:
-                time.sleep(self.resolution)
+            with self.mutex:
+                entry = self._pop_due()
+                if not entry and self.running:
+                    # Sleep until the head is due, or until the queue changes
+                    self.changed.wait(self._timeout())
+            if entry:
+                self.execute(entry[1], entry[0])
 
         self.log.debug("Stopped tasks")
 
-    def execute(self, task: Task) -> None:
-        def wrapper():
-            try:
-                start = now()
-                task.func()
-                duration = (now() - start).total_seconds()
-                self.log.debug("Task %s took %.2fs", task.id, duration)
-            except Exception:
-                self.log.exception("Error in task: %s", task.id)
-
-        self.log.debug("Executing task: %s", task.id)
-        threading.Thread(target=wrapper, name=task.id, daemon=True).start()
+    def execute(self, task: Task, key: float | None = None) -> None:
+        "Hand a due task over to the executor, with its deadline for lag metrics"
+        due = None if key is None else time.monotonic() - (self.clock() - key)
+        self.executor.submit(task, due)
 
     def stop(self) -> None:
         "Stop polling, must be called from the main thread."
         if self.running:
             self.log.debug("Stopping tasks (%d pending)" % len(self))
-            self.running = False
+            with self.mutex:
+                self.running = False
+                self.changed.notify()
             self.worker.join()
+            self.executor.shutdown()
+
+
+class AsyncTasks(BaseTasks):
+    """Scheduled tasks on an asyncio event loop.
+    Timers use `loop.call_at`. Coroutine functions are awaited on the loop,
+    plain functions run in the loop's default executor.
+    Tasks may be added and cancelled from any thread.
+    """
+
+    Task = BaseTasks.Task
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop | None = None,
+        log_level: int = logging.INFO,
+    ):
+        """Schedule tasks on the given event loop,
+        or on a new loop in a daemon thread.
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.log.setLevel(log_level)
+        self.mutex = threading.Lock()
+        self.pending: dict[str, list] = {}  # [task, timer handle] by ID
+        self.active: set[asyncio.Task] = set()  # Keep references until done
+        self.store: TaskStore | None = None
+        self.metrics = TaskMetrics()
+        self.holdback = HoldBack(self.metrics, self.log)  # Only used on the loop
+        self.thread = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=loop.run_forever, daemon=True, name="event_loop"
+            )
+            self.thread.start()
+        self.loop = loop
+
+    def add(self, value: Task) -> None:
+        "Add a task, replacing any task with the same ID"
+        entry = [value, None]
+        with self.mutex:
+            if self.store:  # Before the timer can fire and delete it
+                self.store.save(value)
+            old = self.pending.get(value.id)
+            self.pending[value.id] = entry
+            self.log.debug("Added task (%d pending): %s", len(self.pending), value)
+        delay = (value.when - now()).total_seconds()
+        self.loop.call_soon_threadsafe(self._schedule, entry, delay, old)
+
+    def cancel(self, id: str) -> None:
+        "Remove the task with the given ID"
+        with self.mutex:
+            entry = self.pending.pop(id, None)
+            if entry and self.store:
+                self.store.delete(id)
+        if entry:
+            self.log.debug("Removed task (%d pending): %s", len(self), entry[0])
+            self.loop.call_soon_threadsafe(self._unschedule, entry)
+
+    def _schedule(self, entry: list, delay: float, old: list | None) -> None:
+        "Start the timer for a task, on the loop"
+        if old:
+            self._unschedule(old)
+        with self.mutex:
+            if self.pending.get(entry[0].id) is not entry:
+                return  # cancelled or replaced already
+            entry[1] = self.loop.call_at(self.loop.time() + delay, self._fire, entry)
+
+    def _unschedule(self, entry: list) -> None:
+        "Cancel the timer for a task, on the loop"
+        if entry[1]:
+            entry[1].cancel()
+
+    def _fire(self, entry: list) -> None:
+        "Timer callback"
+        task = entry[0]
+        with self.mutex:
+            if self.pending.get(task.id) is not entry:
+                return
+            del self.pending[task.id]
+            if self.store:
+                self.store.delete(task.id)
+
+        # Deadline on the monotonic clock, for lag metrics
+        due = time.monotonic() - (self.loop.time() - entry[1].when())
+        if not self.holdback.admit(task, (task, due)):
+            return
+
+        job = self.loop.create_task(self._run(task, due), name=task.id)
+        self.active.add(job)
+        job.add_done_callback(self.active.discard)
+
+    async def _run(self, task: Task, due: float | None = None) -> None:
+        "Execute a task and then the task held back for its ID"
+        while True:
+            await self.execute(task, due)
+            item = self.holdback.release(task)
+            if item is None:
+                break
+            task, due = item
+
+    async def execute(self, task: Task, due: float | None = None) -> None:
+        start = self.metrics.start(task, due)
+        timer = None
+        if task.timeout:
+            timer = self.loop.call_later(task.timeout, self.hang, task)
+
+        self.log.debug("Executing task: %s", task.id)
+        try:
+            if iscoroutinefunction(task.func):
+                await task.func()
+            else:
+                result = await self.loop.run_in_executor(None, task.func)
+                if iscoroutine(result):
+                    await result
+            duration = self.metrics.finish(task, start)
+            self.log.debug("Task %s took %.2fs", task.id, duration)
+        except Exception:
+            self.metrics.finish(task, start, failed=True)
+            self.log.exception("Error in task: %s", task.id)
+        except asyncio.CancelledError:
+            self.metrics.finish(task, start, failed=True)
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+
+    def hang(self, task: Task) -> None:
+        "Mark a task as hung after its timeout"
+        self.log.warning("Task %s is hung after %ss", task.id, task.timeout)
+        self.metrics.hang(task)
+
+    def __len__(self) -> int:
+        "Number of tasks in the queue"
+        return len(self.pending)
+
+    def __contains__(self, element: object) -> bool:
+        "Membership test"
+        if type(element) is str:
+            return element in self.pending
+        entry = self.pending.get(getattr(element, "id", None))
+        return entry is not None and entry[0] == element
+
+    def __iter__(self):
+        return iter([entry[0] for entry in list(self.pending.values())])
+
+    def summary(self) -> str:
+        return "%d Tasks, %d running" % (len(self), len(self.active))
+
+    def stop(self) -> None:
+        "Cancel all timers, and stop the event loop if it is owned by this object"
+        with self.mutex:
+            entries = list(self.pending.values())
+            self.pending.clear()
+        self.log.debug("Stopping tasks (%d pending)" % len(entries))
+        for entry in entries:
+            self.loop.call_soon_threadsafe(self._unschedule, entry)
+        if self.thread:
+            asyncio.run_coroutine_threadsafe(self._cancel_active(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.thread = None
+            self.loop.close()
+
+    async def _cancel_active(self) -> None:
+        "Cancel running tasks"
+        for job in self.active:
+            job.cancel()
+        await asyncio.gather(*self.active, return_exceptions=True)
+
+
+class CronSchedule:
+    """A compiled cron expression.
+    Finds the next slot by skipping non-matching days, hours and minutes,
+    without iterating over past slots.
+    Falls back to `croniter` for extensions like `L` or `#`.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields, special = croniter.expand(expr)
+        self.compiled = (
+            len(fields) == 5
+            and not special
+            and all(type(v) is int or v == "*" for f in fields for v in f)
+        )
+        if not self.compiled:
+            return
+
+        minutes, hours, days, months, weekdays = (
+            None if "*" in f else frozenset(f) for f in fields
+        )
+        self.minutes = sorted(minutes) if minutes else list(range(60))
+        self.hours = sorted(hours) if hours else list(range(24))
+        self.days = days
+        self.months = months
+        self.weekdays = frozenset(d % 7 for d in weekdays) if weekdays else None
+
+    def __repr__(self) -> str:
+        return "CronSchedule(%r)" % self.expr
+
+    def matches(self, day: datetime) -> bool:
+        "Check the date fields"
+        if self.months and day.month not in self.months:
+            return False
+        dom = self.days is None or day.day in self.days
+        dow = self.weekdays is None or day.isoweekday() % 7 in self.weekdays
+        if self.days is not None and self.weekdays is not None:
+            return dom or dow  # like cron
+        return dom and dow
+
+    def next(self, after: datetime) -> datetime:
+        """Get the first slot after the given time.
+        Slots in local time that are skipped by a DST change are left out,
+        slots in a repeated hour only run at their first occurrence.
+        """
+        if not self.compiled:
+            return croniter(self.expr, after).get_next(datetime)
+
+        start = after.astimezone().replace(second=0, microsecond=0, tzinfo=None)
+        for slot in self.slots(start + timedelta(minutes=1)):
+            local = slot.astimezone()
+            if local.replace(tzinfo=None) == slot and local > after:
+                return local
+
+        # Nothing within the search range, let croniter decide
+        return croniter(self.expr, after).get_next(datetime)
+
+    def slots(self, start: datetime) -> Iterator[datetime]:
+        "Generate matching naive local times from `start` on"
+        day = start.replace(hour=0, minute=0)
+        hour, minute = start.hour, start.minute
+
+        for _n in range(5 * 366):  # Long enough for February 29
+            if self.matches(day):
+                h = bisect_left(self.hours, hour)
+                if h < len(self.hours) and self.hours[h] == hour:
+                    for m in self.minutes[bisect_left(self.minutes, minute) :]:
+                        yield day.replace(hour=hour, minute=m)
+                    h += 1
+                for hour in self.hours[h:]:
+                    for m in self.minutes:
+                        yield day.replace(hour=hour, minute=m)
+            day += timedelta(days=1)
+            hour = minute = 0
 
 
 class Scheduler:
     "Mixin class for time-based task execution"
 
+    CronTask = namedtuple(
+        "CronTask", "schedule jitter catch_up overlap timeout method task"
+    )
+    DelayedTask = namedtuple("DelayedTask", "method overlap timeout")
+
+    # Catch-up policies for cron tasks missed while the skill was not running
+    SKIP = "skip"
+    ONCE = "once"
+    ALL = "all"
+
     log: logging.Logger
-    startup_tasks: set[tuple[datetime, Callable]] = set()
+    persistent_tasks: dict[str, DelayedTask] = {}  # Restorable tasks by ID
+    cron_tasks: dict[str, CronTask] = {}  # Cron settings by task ID
+
+    # Executor settings, may be overridden
+    task_workers = 4
+    task_queue_size = 64
+    task_overflow = Executor.BLOCK
+
+    # Pending task queue, e.g. `TimingWheel` for many short delays
+    task_queue: Callable = TaskHeap
+
+    # Database file for delayed tasks and cron runs, optional
+    task_store_path: str | None = None
+    task_store: TaskStore | None = None
 
     def run(self) -> None:
         self.log.debug("--- Starting with PID: %d ---", os.getpid())
 
-        self.tasks = Tasks(resolution=1, daemon=True, log_level=self.log.level)
+        self.tasks = self.create_tasks()
         signal(SIGUSR2, self.dump_tasks)
 
-        for when, method in self.startup_tasks:
-            self.tasks.create(partial(method, self), when, method.__name__)
+        if self.task_store_path:
+            self.task_store = TaskStore(self.task_store_path, self.persistent_tasks)
+            self.restore_tasks()
+
+        for id, entry in self.cron_tasks.items():
+            self.tasks.create(
+                partial(entry.task, self),
+                self.cron_time(id),
+                id,
+                entry.overlap,
+                entry.timeout,
+            )
 
         try:
             super().run()  # pyright: ignore[reportAttributeAccessIssue]
         finally:
             self.tasks.stop()
+            if self.task_store:
+                self.task_store.close()
+
+    def restore_tasks(self) -> None:
+        "Reschedule saved tasks, and catch up on missed cron tasks"
+        assert self.task_store, "No task store"
+        self.tasks.store = self.task_store
+
+        pending = self.task_store.pending()
+        self.log.debug("Restoring %d tasks", len(pending))
+        self.tasks.addAll(
+            self.tasks.Task(
+                when, id, partial(entry.method, self), entry.overlap, entry.timeout
+            )
+            for id, when in pending
+            if (entry := self.persistent_tasks.get(id))
+        )
+
+        for id, entry in self.cron_tasks.items():
+            last_run = self.task_store.last_run(id)
+            if entry.catch_up == self.SKIP or last_run is None:
+                continue
+
+            missed, when, current = 0, self.cron_time(id, last_run), now()
+            while when <= current:
+                missed += 1
+                if entry.catch_up == self.ONCE:
+                    break
+                previous, when = when, self.cron_time(id, when)
+                if when <= previous:  # Must advance, or this never ends
+                    self.log.warning("Schedule for %s stalled at %s", id, previous)
+                    break
+            if missed:
+                self.log.info("Catching up on %s: %d run(s)", id, missed)
+                self.tasks.create(
+                    repeat(entry.method, self, missed), id=id + "_catch_up"
+                )
+
+    def cron_time(self, id: str, after: datetime | None = None) -> datetime:
+        "Get the next invocation time of a cron task, including jitter"
+        entry = self.cron_tasks[id]
+        offset = timedelta(seconds=self.cron_jitter(id, entry.jitter))
+        return entry.schedule.next((after or now()) - offset) + offset
+
+    def cron_jitter(self, id: str, limit: int) -> int:
+        """Get a stable delay of up to `limit` seconds for a task ID,
+        from the class name and the configured MQTT client ID, if any
+        """
+        if not limit:
+            return 0
+        client_id = getattr(self, "configured_client_id", None) or ""
+        seed = "/".join((type(self).__qualname__, client_id, id))
+        return zlib.crc32(seed.encode()) % (limit + 1)
+
+    def create_tasks(self) -> BaseTasks:
+        "Set up the task queue"
+        executor = Executor(
+            self.task_workers,
+            self.task_queue_size,
+            self.task_overflow,
+            log_level=self.log.level,
+        )
+        return Tasks(
+            daemon=True,
+            log_level=self.log.level,
+            executor=executor,
+            queue=self.task_queue,
+        )
 
     def dump_tasks(self, _signal, _frame):
-        "List pending tasks"
+        "List pending tasks and executor statistics"
         print("Pending tasks: %s" % self.tasks)
 
 
-def delay(minutes: int = 0, seconds: int = 0, randomize: bool = False):
-    "Decorator to delay method execution by a given duration"
+class AsyncScheduler(Scheduler):
+    """Mixin class for time-based task execution on an asyncio event loop.
+    `@cron` and `@delay` accept `async def` methods.
+    Set `self.event_loop` before `run()` to use an existing loop,
+    otherwise a new loop runs in a daemon thread.
+    """
+
+    # Not `loop`, which would shadow `Client.loop` of Paho MQTT clients
+    event_loop: asyncio.AbstractEventLoop | None = None
+
+    def create_tasks(self) -> AsyncTasks:
+        "Set up the task queue on the event loop"
+        tasks = AsyncTasks(self.event_loop, log_level=self.log.level)
+        self.event_loop = tasks.loop
+        return tasks
+
+
+def delay(
+    minutes: int = 0,
+    seconds: int = 0,
+    randomize: bool = False,
+    overlap: str = Executor.QUEUE_ONE,
+    timeout: float | None = None,
+):
+    """Decorator to delay method execution by a given duration.
+    The decorated method may be a coroutine function,
+    but calling it only schedules the task and returns `None`.
+    :param overlap: Policy if the method is still running when due again,
+        one of `Executor.SKIP_IF_RUNNING`, `Executor.QUEUE_ONE`
+        or `Executor.ALLOW_OVERLAP`.
+    :param timeout: Seconds after which a running task is marked as hung.
+    """
 
     def wrapper(method):
         @wraps(method)
@@ -182,29 +1326,93 @@ def delay(minutes: int = 0, seconds: int = 0, randomize: bool = False):
                 partial(method, self),
                 now() + timedelta(seconds=secs),
                 "delayed_" + method.__name__,
+                overlap,
+                timeout,
             )
 
+        Scheduler.persistent_tasks["delayed_" + method.__name__] = (
+            Scheduler.DelayedTask(method, overlap, timeout)
+        )
         return delayed_task
 
     return wrapper
 
 
-def cron(schedule: str, log_level: int = logging.DEBUG):
-    "Decorator for periodic tasks"
-    sequence = croniter(schedule, now())
+def cron(
+    schedule: str,
+    log_level: int = logging.DEBUG,
+    catch_up: str = Scheduler.SKIP,
+    jitter: int = 0,
+    overlap: str = Executor.QUEUE_ONE,
+    timeout: float | None = None,
+):
+    """Decorator for periodic tasks, which may be coroutine functions.
+    :param schedule: Cron expression
+    :param log_level: Log invocations at this level
+    :param catch_up: Policy for runs missed while the skill was not running,
+        one of `Scheduler.SKIP`, `Scheduler.ONCE` or `Scheduler.ALL`.
+        Requires a `Scheduler.task_store_path`.
+    :param jitter: Maximum delay in seconds to spread load between clients.
+        The actual delay is fixed per client ID and task.
+    :param overlap: Policy if the method is still running when due again,
+        one of `Executor.SKIP_IF_RUNNING`, `Executor.QUEUE_ONE`
+        or `Executor.ALLOW_OVERLAP`.
+    :param timeout: Seconds after which a running task is marked as hung.
+    """
+    assert catch_up in (Scheduler.SKIP, Scheduler.ONCE, Scheduler.ALL), (
+        f"Unknown catch-up policy: {catch_up}"
+    )
+    compiled = CronSchedule(schedule)
 
     def wrapper(method):
-        @wraps(method)
-        def periodic_task(self):
+        def reschedule(self):
             if method.__name__ not in self.tasks:
-                when = sequence.get_next(datetime)
-                while when < now():
-                    when = sequence.get_next(datetime)
-                self.tasks.create(partial(periodic_task, self), when, method.__name__)
+                when = self.cron_time(method.__name__)
+                self.tasks.create(
+                    partial(periodic_task, self),
+                    when,
+                    method.__name__,
+                    overlap,
+                    timeout,
+                )
+            if self.task_store:
+                self.task_store.set_last_run(method.__name__, now())
             self.log.log(log_level, "Invoking: %s" % method.__name__)
-            method(self)
 
-        Scheduler.startup_tasks.add((sequence.get_next(datetime), periodic_task))
+        if iscoroutinefunction(method):
+
+            @wraps(method)
+            async def periodic_task(self):  # pyright: ignore[reportRedeclaration]
+                reschedule(self)
+                await method(self)
+
+        else:
+
+            @wraps(method)
+            def periodic_task(self):
+                reschedule(self)
+                method(self)
+
+        Scheduler.cron_tasks[method.__name__] = Scheduler.CronTask(
+            compiled, jitter, catch_up, overlap, timeout, method, periodic_task
+        )
         return periodic_task
 
     return wrapper
+
+
+def repeat(method: Callable, self, times: int) -> Callable:
+    "Create a task function that invokes a method several times in a row"
+    if iscoroutinefunction(method):
+
+        async def repeated():  # pyright: ignore[reportRedeclaration]
+            for _n in range(times):
+                await method(self)
+
+    else:
+
+        def repeated():
+            for _n in range(times):
+                method(self)
+
+    return repeated
@@ -1,6 +1,17 @@
 import unittest
 
-from expr import Parser
+from expr import Network, Parser, get_parser
+
+
+class AggregateState(dict):
+    "Topic values with fixed window aggregates"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.aggregates = {}
+
+    def aggregate(self, func, topic, seconds):
+        return self.aggregates[(func, topic, seconds)]
 
 
 class ExprTest(unittest.TestCase):
@@ -153,6 +164,99 @@ class ExprTest(unittest.TestCase):
         self.assertTrue(expr({"topic/a": 1, "topic/b": 3}))
         self.assertTrue(expr.last_state)
 
+    def test_short_circuit(self):
+        expr = self.parser.parse("topic/a == 1 or topic/b ~= 'x'")
+        self.assertTrue(expr({"topic/a": 1}))  # topic/b is not evaluated
+        self.assertRaises(KeyError, expr, {"topic/a": 0})
+
+    def test_compiled(self):
+        text = "topic/a > 1 and not topic/b == 'off'"
+        expr = self.parser.parse(text)
+        self.assertEqual(text, expr.expr.__doc__)
+        self.assertIsNone(expr.expr.__closure__)  # one flat function
+
+    def test_memoized(self):
+        text = "topic/a >= 1 or topic/b == 'on'"
+        first, second = self.parser.parse(text), self.parser.parse(text)
+        self.assertIs(first.expr.__code__, second.expr.__code__)
+        self.assertNotEqual(first, second)  # Distinct conditions
+        self.assertTrue(first({"topic/a": 1}))
+        self.assertIsNone(second.last_state)
+
+    def test_bind(self):
+        template = self.parser.parse("x/{room}/lux < 30 and x/{room}/motion == 1")
+        expr = template.bind(room="hall")
+        self.assertEqual({"x/hall/lux", "x/hall/motion"}, expr.keys)
+        self.assertEqual("x/hall/lux < 30 and x/hall/motion == 1", expr.text)
+        self.assertIs(template.expr.__code__, expr.expr.__code__)
+        self.assertTrue(expr({"x/hall/lux": 10, "x/hall/motion": 1}))
+        self.assertEqual(("x/hall/lux", "<", 30), expr.terms[0].key)
+        self.assertFalse(expr.terms[0].func(40))
+
+    def test_aggregate(self):
+        expr = self.parser.parse("avg(topic/p, 5m) > 2000 and max/topic == 1")
+        self.assertEqual({"topic/p", "max/topic"}, expr.keys)
+        self.assertEqual(("avg", 300, 2000), expr.terms[0].window)
+        self.assertIsNone(expr.terms[1].window)
+
+        state = AggregateState({"max/topic": 1})
+        state.aggregates[("avg", "topic/p", 300)] = 2500
+        self.assertTrue(expr(state))
+        state.aggregates[("avg", "topic/p", 300)] = 1500
+        self.assertFalse(expr(state))
+        self.assertRaises(AssertionError, self.parser.parse, "avg(topic/p) > 1")
+
+    def test_shared(self):
+        self.assertIs(get_parser(), get_parser())
+
+
+class NetworkTest(unittest.TestCase):
+    parser = Parser()
+
+    def setUp(self):
+        self.network = Network()
+        self.away = self.parser.parse("topic/mode == 'away' and topic/a > 1")
+        self.home = self.parser.parse("not topic/mode == 'away' or topic/b < 0")
+        self.network.add(self.away)
+        self.network.add(self.home)
+        self.values = []
+
+    def test_shared_terms(self):
+        self.assertEqual(3, len(self.network.terms))
+        self.assertEqual(
+            [self.away, self.home],
+            self.network.update([], {"topic/mode": "x"}, "topic/mode"),
+        )
+
+    def test_update(self):
+        state = {"topic/mode": "away", "topic/a": 2, "topic/b": 1}
+        changed = self.network.update(self.values, state, "topic/a")
+        self.assertEqual([self.away], changed)
+        self.assertTrue(self.network.evaluate(self.away, self.values, state))
+        self.assertTrue(self.away.last_state)
+        self.assertFalse(self.network.evaluate(self.home, self.values, state))
+
+        state["topic/a"] = 3  # Same term value
+        self.assertEqual([], self.network.update(self.values, state, "topic/a"))
+        self.assertEqual([], self.network.update(self.values, state, "topic/c"))
+
+        state["topic/mode"] = "home"
+        changed = self.network.update(self.values, state, "topic/mode")
+        self.assertEqual([self.away, self.home], changed)
+        self.assertFalse(self.network.evaluate(self.away, self.values, state))
+        self.assertTrue(self.network.evaluate(self.home, self.values, state))
+
+    def test_failure(self):
+        state = {"topic/mode": "home", "topic/b": "foo"}
+        self.network.update(self.values, state, "topic/b")
+        self.assertTrue(self.network.evaluate(self.home, self.values, state))
+
+        state["topic/mode"] = "away"
+        self.network.update(self.values, state, "topic/mode")
+        self.assertRaises(
+            ValueError, self.network.evaluate, self.home, self.values, state
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,117 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from history import Average, Changes, History, Maximum, Minimum
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.sut = History(4)
+
+    def fill(self, *values, start=1000.0):
+        for n, value in enumerate(values):
+            self.sut.append(value, start + n)
+
+    def test_empty(self):
+        self.assertEqual(0, len(self.sut))
+        self.assertEqual([], self.sut.last())
+        self.assertIsNone(self.sut.min())
+        self.assertIsNone(self.sut.mean())
+
+    def test_wrap(self):
+        self.fill(1, 2, 3, 4, 5, 6)
+        self.assertEqual(4, len(self.sut))
+        self.assertEqual([3, 4, 5, 6], self.sut.last())
+        self.assertEqual([5, 6], self.sut.last(2))
+        self.assertEqual([(1004.0, 5), (1005.0, 6)], list(self.sut)[2:])
+
+    @patch("history.time.time", return_value=1005.0)
+    def test_window(self, _time):
+        self.fill(10, 30, 20, 5, 15, 25)
+        self.assertEqual([5, 15, 25], self.sut.last(seconds=2))
+        self.assertEqual(5, self.sut.min(seconds=2))
+        self.assertEqual(25, self.sut.max(seconds=2))
+        self.assertEqual(15, self.sut.mean(seconds=2))
+        self.assertEqual(16.25, self.sut.mean())  # 10 and 30 were overwritten
+        self.assertEqual([], self.sut.last(seconds=-1))
+
+    def test_default_time(self):
+        before = time.time()
+        self.sut.append(1)
+        self.assertLessEqual(before, next(iter(self.sut))[0])
+
+
+class AggregateTest(unittest.TestCase):
+    def test_average(self):
+        sut = Average(10)
+        self.assertIsNone(sut.value(100))
+        sut.append(3, 100)
+        self.assertEqual(3, sut.value(100))
+        sut.append(10, 105)
+        self.assertAlmostEqual((5 * 3 + 2 * 10) / 7, sut.value(107))  # Only 7s known
+        self.assertAlmostEqual((5 * 3 + 5 * 10) / 10, sut.value(110))
+        self.assertAlmostEqual(10, sut.value(120))
+        sut.append(20, 121)
+        self.assertAlmostEqual((6 * 10 + 4 * 20) / 10, sut.value(125))
+        sut.append("off", 126)  # Ignored
+        self.assertEqual(2, len(sut.points))
+
+    def test_average_crossing(self):
+        sut = Average(600)
+        sut.append(0, 0)
+        self.assertIsNone(sut.next_change(2000, 50))  # Constant
+        sut.append(3000, 100)
+        when = sut.next_change(2000, 100)  # While the window fills up
+        self.assertAlmostEqual(300, when)
+        self.assertAlmostEqual(2000, sut.value(when))
+        self.assertAlmostEqual(600, sut.next_change(4000, 100))  # Window is full
+
+        sut = Average(600)
+        sut.append(0, -1000)
+        sut.append(3000, 100)
+        when = sut.next_change(2000, 100)  # While the window slides
+        self.assertAlmostEqual(500, when)
+        self.assertAlmostEqual(2000, sut.value(when))
+        self.assertAlmostEqual(700, sut.next_change(2000, 600))  # Zero drops out
+        self.assertIsNone(sut.next_change(2000, 700))
+
+    def test_maximum(self):
+        sut = Maximum(10)
+        for when, value in ((100, 5), (102, 3), (104, 4)):
+            sut.append(value, when)
+        self.assertEqual(5, sut.value(105))
+        self.assertEqual(5, sut.value(111))
+        self.assertEqual(4, sut.value(112))
+        self.assertEqual(1, len(sut.entries))
+
+    def test_maximum_expiry(self):
+        sut = Maximum(10)
+        sut.append(5, 100)
+        self.assertIsNone(sut.next_change(4, 101))  # Still current
+        sut.append(3, 102)
+        self.assertEqual(112, sut.next_change(4, 103))
+        self.assertIsNone(sut.next_change(4, 112))
+
+    def test_minimum(self):
+        sut = Minimum(10)
+        for when, value in ((100, 5), (102, 3), (104, 4)):
+            sut.append(value, when)
+        self.assertEqual(3, sut.value(105))
+        self.assertEqual(3, sut.value(113))
+        self.assertEqual(4, sut.value(114))
+
+    def test_changes(self):
+        sut = Changes(10)
+        for when in (100, 101, 105):
+            sut.append("on", when)
+        self.assertEqual(3, sut.value(105))
+        self.assertEqual(2, sut.value(110))
+        self.assertEqual(0, sut.value(115))
+        self.assertIsNone(sut.next_change(1, 115))
+        sut.append("off", 120)
+        self.assertEqual(130, sut.next_change(1, 121))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import logging
+import random
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from snips_skill.mqtt import Dispatcher, MqttClient, session_key, topic
+
+
+class DispatcherTest(unittest.TestCase):
+    def test_order(self):
+        sut = Dispatcher(workers=3)
+        output = []
+        done = threading.Semaphore(0)
+
+        def record(key, n):
+            time.sleep(random.random() / 1000)
+            output.append((key, n))
+            done.release()
+
+        for n in range(100):
+            sut.submit(n % 5, record, n % 5, n)
+        for _n in range(100):
+            self.assertTrue(done.acquire(timeout=1))
+
+        for key in range(5):
+            received = [n for k, n in output if k == key]
+            self.assertEqual(list(range(key, 100, 5)), received)
+
+    def test_overflow(self):
+        sut = Dispatcher(workers=1, queue_size=1, timeout=0.01)
+        started, release = threading.Event(), threading.Event()
+
+        def busy():
+            started.set()
+            release.wait(1)
+
+        sut.submit("a", busy)
+        self.assertTrue(started.wait(1))
+        sut.submit("a", print)  # Queued
+
+        with self.assertLogs("Dispatcher", logging.WARNING):
+            sut.submit("a", print)
+        self.assertEqual(1, sut.dropped)
+        self.assertIn("dropped: 1", repr(sut))
+        release.set()
+
+    def test_session_key(self):
+        msg = SimpleNamespace(topic="hermes/intent/x", payload=b'{"sessionId": "s"}')
+        self.assertEqual("s", session_key(msg))
+        msg.payload = b"raw"
+        self.assertEqual("hermes/intent/x", session_key(msg))
+
+
+class TopicDispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = MqttClient()
+        self.client.log = logging.getLogger("TopicDispatchTest")
+
+    def test_dispatch(self):
+        called = threading.Event()
+
+        def callback(client, userdata, msg):
+            called.thread = threading.current_thread().name
+            called.set()
+
+        with patch.dict(MqttClient.SUBSCRIPTIONS):
+            wrapped = topic("test/#", dispatch=MqttClient.BY_TOPIC)(callback)
+        wrapped(self.client, None, SimpleNamespace(topic="test/a", payload=b""))
+
+        self.assertTrue(called.wait(1))
+        self.assertTrue(called.thread.startswith("dispatch_"))
+
+    def test_inline(self):
+        with patch.dict(MqttClient.SUBSCRIPTIONS):
+            wrapped = topic("test/#")(lambda client, userdata, msg: msg.topic)
+        msg = SimpleNamespace(topic="test/a", payload=b"")
+        self.assertEqual("test/a", wrapped(self.client, None, msg))
+        self.assertIsNone(self.client.dispatcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
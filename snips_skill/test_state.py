@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from paho.mqtt.client import MQTT_ERR_NO_CONN, MQTT_ERR_SUCCESS
+
+from snips_skill.mqtt import MqttClient
+from snips_skill.state import PublishCache, StateAwareMixin, conditional, when
+
+
+class Config:
+    def get_config(self):
+        return {"status_topic": "status/#"}
+
+    def publish(self, topic, payload, qos, retain, log_level):
+        self.published.append((topic, payload))
+        return SimpleNamespace(rc=self.publish_rc)
+
+
+class Skill(StateAwareMixin, Config):
+    log = logging.getLogger("StateTest")
+
+    publish_cache_size = 2
+    publish_rc = MQTT_ERR_SUCCESS
+    publish_ttls = {"device/+/get": 0}
+    rooms = ("kitchen", "bath")
+
+    def __init__(self):
+        self.output = []
+        self.published = []
+        super().__init__()
+
+    @when("status/a == 1 and status/b == 2")
+    def both(self):
+        self.output.append("both")
+
+    @when("status/c == 3")
+    def other(self):
+        self.output.append("other")
+
+    @when("max(status/power, 1m) > 100")
+    def peak(self):
+        self.output.append("peak")
+
+    @when("status/{room}/motion == 1", room=lambda self: self.rooms)
+    def motion(self, room):
+        self.output.append("motion: " + room)
+
+    @when("status/{room}/door == 1", room="hall")
+    def door(self, room):
+        self.output.append("door: " + room)
+
+    @conditional("max(status/spike, 0.1s) > 100")
+    def spike(self, value):
+        self.output.append("spike: %s" % value)
+
+    @conditional("avg(status/load, 0.3s) > 2000")
+    def load(self, value):
+        self.output.append("load: %s" % value)
+
+
+class StateTest(unittest.TestCase):
+    def setUp(self):
+        for expr in StateAwareMixin.conditions:
+            expr.last_state = None
+        with patch.dict(MqttClient.SUBSCRIPTIONS):
+            self.sut = Skill()
+
+    def update(self, topic, payload):
+        self.sut.update_status(None, SimpleNamespace(topic=topic, payload=payload))
+
+    def wait_for(self, output):
+        deadline = time.monotonic() + 1
+        while output not in self.sut.output and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertIn(output, self.sut.output)
+
+    def test_index(self):
+        self.assertIn("status/a", StateAwareMixin.dependents)
+        self.assertEqual(
+            StateAwareMixin.dependents["status/a"],
+            StateAwareMixin.dependents["status/b"],
+        )
+        self.assertNotIn("status/d", StateAwareMixin.dependents)
+
+    def test_missing_keys(self):
+        self.update("status/a", 1)
+        self.assertEqual([], self.sut.output)
+        self.update("status/b", 2)
+        self.assertEqual(["both"], self.sut.output)
+
+        self.update("status/c", 3)
+        self.update("status/d", 4)
+        self.assertEqual(["both", "other"], self.sut.output)
+
+    def test_history(self):
+        with patch.object(Skill, "history_topics", {"status/temp/+": 8}):
+            for value in (20, "21.5", "off", True, 22):
+                self.update("status/temp/kitchen", value)
+            self.update("status/a", 1)
+
+        self.assertEqual(["status/temp/kitchen"], list(self.sut.history))
+        history = self.sut.history["status/temp/kitchen"]
+        self.assertEqual([20, 21.5, 22], history.last())
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            self.update("status/a", 1)
+            self.update("status/c", 3)
+            self.update("status/raw", b"\x00")
+            self.sut.save_snapshot(path)
+            self.assertEqual(["state.json"], os.listdir(tmp))
+
+            self.setUp()  # Restart
+            self.sut.load_snapshot(path)
+        self.assertEqual({"status/a": 1, "status/c": 3}, self.sut.current_state)
+
+        self.update("status/c", 3)
+        self.update("status/b", 2)
+        self.assertEqual(["both"], self.sut.output)  # "other" was already true
+
+    def test_publish(self):
+        self.update("status/a", 1)
+        for topic in ("status/a", "device/1/set", "device/1/set", "device/1/get"):
+            self.sut.publish(topic, 1)
+        self.sut.publish("device/1/get", 1)
+        self.sut.publish("device/1/set", 2)
+        self.assertEqual(
+            [("device/1/set", 1), ("device/1/get", 1), ("device/1/get", 1)]
+            + [("device/1/set", 2)],
+            self.sut.published,
+        )
+        self.assertEqual(1, self.sut.publish_cache.suppressed)
+
+    def test_failed_publish(self):
+        self.sut.publish_rc = MQTT_ERR_NO_CONN
+        self.sut.publish("device/1/set", 1)
+        self.sut.publish_rc = MQTT_ERR_SUCCESS
+        self.sut.publish("device/1/set", 1)  # Not a duplicate
+        self.assertEqual([("device/1/set", 1)] * 2, self.sut.published)
+
+    def test_raw_payload(self):
+        with patch("snips_skill.state.decode_json", side_effect=json.loads) as decode:
+            for payload in (b"1", b"1", b"2", b"2", b"1"):
+                self.update("status/c", payload)
+        self.assertEqual(3, decode.call_count)
+        self.assertEqual(1, self.sut.current_state["status/c"])
+        self.assertEqual((b"1", 1), self.sut.raw_state["status/c"])
+
+    def test_subscriptions(self):
+        self.assertEqual(["status/#"], self.sut.status_subscriptions("status/#"))
+
+        self.sut.narrow_subscriptions = True
+        self.sut.status_topics = ("status/extra", "other/topic")
+        with patch.dict(MqttClient.SUBSCRIPTIONS, clear=True):
+            self.sut.__init__()
+            subscriptions = set(MqttClient.SUBSCRIPTIONS)
+        self.assertLessEqual(
+            {"status/a", "status/b", "status/c", "status/extra"}, subscriptions
+        )
+        self.assertNotIn("status/#", subscriptions)
+        self.assertNotIn("other/topic", subscriptions)
+
+    def test_condition_stats(self):
+        for value in (3, 0, 3):
+            self.update("status/c", value)
+        self.update("status/a", 1)
+
+        stats = self.sut.condition_stats["other"]
+        self.assertEqual("status/c == 3", stats.expression)
+        self.assertEqual(3, stats.evaluations)
+        self.assertEqual((2, 1), (stats.rising, stats.falling))
+        self.assertEqual(2, stats.invocations)
+        self.assertNotIn("both", self.sut.condition_stats)  # status/b is unknown
+
+    def test_template(self):
+        self.update("status/kitchen/motion", 1)
+        self.update("status/hall/motion", 1)
+        self.update("status/bath/motion", 0)
+        self.assertEqual(["motion: kitchen"], self.sut.output)
+        self.assertIn("motion(room='kitchen')", self.sut.condition_stats)
+        self.assertEqual(0, self.sut.condition_stats["motion(room='bath')"].invocations)
+
+        # Expanded only once across instances
+        self.assertEqual(1, len(StateAwareMixin.dependents["status/bath/motion"]))
+        self.assertNotIn("status/{room}/motion", StateAwareMixin.dependents)
+
+    def test_scalar_binding(self):
+        self.update("status/hall/door", 1)
+        self.assertEqual(["door: hall"], self.sut.output)
+        self.assertNotIn("status/h/door", StateAwareMixin.dependents)
+
+    def test_unbound_placeholder(self):
+        register = when("status/{room}/window == 1", floor=(1, 2))
+        self.assertRaises(AssertionError, register, lambda self, floor: None)
+
+    def test_aggregate(self):
+        for value in (50, 150, 80, "off", 120):
+            self.update("status/power", value)
+        self.assertEqual(["peak"], self.sut.output)  # Still above 100
+        state = self.sut.current_state
+        self.assertEqual(150, state.aggregate("max", "status/power", 60))
+        self.assertEqual(1, state.aggregate("changes", "status/power", 60))  # New
+
+    def test_peak_expiry(self):
+        self.update("status/spike", 150)
+        self.update("status/spike", 50)
+        self.assertEqual(["spike: True"], self.sut.output)
+        with self.sut.windows_due:  # Scheduled on the monotonic clock
+            when = min(self.sut.window_checks.values())
+        self.assertAlmostEqual(time.monotonic() + 0.1, when, delta=0.05)
+        self.wait_for("spike: False")  # Without another message
+
+    def test_rising_average(self):
+        self.update("status/load", 0)
+        time.sleep(0.35)  # Fill the window
+        start = time.monotonic()
+        self.update("status/load", 3000)
+        self.assertEqual(["load: False"], self.sut.output)
+        self.wait_for("load: True")  # Crosses after 2/3 of the window
+        self.assertGreater(time.monotonic() - start, 0.15)
+
+    def test_serialized_windows(self):
+        self.update("status/spike", 150)
+        slots = StateAwareMixin.network.windows["status/spike"]
+        with self.sut.evaluating:  # A status update is being evaluated
+            checker = threading.Thread(target=self.sut.check_windows, args=(slots,))
+            checker.start()
+            checker.join(0.05)
+            self.assertTrue(checker.is_alive())
+        checker.join(1)
+        self.assertFalse(checker.is_alive())
+
+    def test_unchanged_aggregate(self):
+        with patch.object(self.sut, "check_windows") as check:
+            for _n in range(3):
+                self.update("status/spike", b"50")
+        self.assertEqual(3, check.call_count)
+
+    def test_topic_types(self):
+        with (
+            patch.object(Skill, "topic_types", {"status/temp/+": float}),
+            patch.dict(MqttClient.SUBSCRIPTIONS),
+        ):
+            self.sut = Skill()
+        self.update("status/temp/kitchen", b'"21.5"')
+        self.update("status/temp/hall", b'"warm"')
+        self.update("status/c", b'"3"')
+        self.assertEqual(21.5, self.sut.current_state["status/temp/kitchen"])
+        self.assertEqual("warm", self.sut.current_state["status/temp/hall"])
+        self.assertEqual("3", self.sut.current_state["status/c"])  # Not declared
+        self.assertEqual(["other"], self.sut.output)  # Converted when compared
+
+    def test_unchanged(self):
+        self.update("status/c", 3)
+        self.update("status/c", 3)
+        self.assertEqual(["other"], self.sut.output)
+
+
+class PublishCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.sut = PublishCache(size=2, ttl=10)
+
+    def send(self, topic, payload):
+        "Publish unless suppressed"
+        if self.sut.check(topic, payload):
+            self.sut.add(topic, payload)
+            return True
+        return False
+
+    def test_duplicate(self):
+        self.assertTrue(self.send("a", 1))
+        self.assertFalse(self.send("a", 1))
+        self.assertTrue(self.send("a", 2))
+        self.assertEqual((2, 1), (self.sut.sent, self.sut.suppressed))
+
+    def test_unsent(self):
+        self.assertTrue(self.sut.check("a", 1))
+        self.assertTrue(self.sut.check("a", 1))  # Not recorded as sent
+        self.assertEqual(0, self.sut.sent)
+
+    def test_lru(self):
+        self.send("a", 1)
+        self.send("b", 1)
+        self.send("a", 2)  # "b" is now the oldest
+        self.send("c", 1)
+        self.assertEqual(["a", "c"], list(self.sut.entries))
+
+    @patch("snips_skill.state.time.monotonic")
+    def test_ttl(self, clock):
+        clock.return_value = 0
+        self.send("a", 1)
+        clock.return_value = 9.9
+        self.assertFalse(self.sut.check("a", 1))
+        clock.return_value = 10
+        self.assertTrue(self.sut.check("a", 1))
+
+
+class ConflatingSkill(Skill):
+    conflate_updates = True
+
+    def __init__(self):
+        self.handled = []
+        self.release = threading.Event()
+        super().__init__()
+
+    def invoke_handlers(self, topic, payload):
+        self.handled.append((topic, payload))
+        self.release.wait(1)
+
+
+class ConflationTest(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(MqttClient.SUBSCRIPTIONS):
+            self.sut = ConflatingSkill()
+
+    def update(self, topic, payload):
+        self.sut.update_status(None, SimpleNamespace(topic=topic, payload=payload))
+
+    def wait_idle(self):
+        deadline = time.monotonic() + 1
+        while self.sut.updates and time.monotonic() < deadline:
+            time.sleep(0.005)
+        time.sleep(0.01)
+
+    def test_conflation(self):
+        self.update("status/x", 0)
+        self.wait_idle()  # The worker is blocked in a handler
+        for n in range(1, 101):
+            self.update("status/x", n)
+        self.update("status/y", 1)
+        self.assertEqual(99, self.sut.conflated)
+
+        self.sut.release.set()
+        self.wait_idle()
+        self.assertEqual(
+            [("status/x", 0), ("status/x", 100), ("status/y", 1)], self.sut.handled
+        )
+        self.assertEqual(100, self.sut.current_state["status/x"])
+
+    def test_repeated_readings(self):
+        self.sut.release.set()
+        threads = set()
+        record = self.sut.record
+
+        def spy(topic, payload):
+            threads.add(threading.current_thread().name)
+            record(topic, payload)
+
+        with (
+            patch.object(Skill, "history_topics", {"status/temp": 8}),
+            patch.object(self.sut, "record", spy),
+        ):
+            for payload in (b"20", b"20", b"21"):
+                self.update("status/temp", payload)
+                self.wait_idle()
+
+        self.assertEqual({"status_updates"}, threads)  # Only the worker
+        self.assertEqual([20, 20, 21], self.sut.history["status/temp"].last())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,30 @@
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import threading
 import time
 import unittest
-from datetime import datetime
-from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from unittest.mock import Mock, patch
 
-from tasks import Tasks
+from croniter import croniter
+from mqtt import MqttClient
+from tasks import (
+    AsyncScheduler,
+    AsyncTasks,
+    CronSchedule,
+    Executor,
+    Scheduler,
+    Tasks,
+    TaskStore,
+    TimingWheel,
+    cron,
+    delay,
+    now,
+)
 
 
 def at(hour, minute=0):
@@ -11,6 +32,29 @@ def at(hour, minute=0):
     return datetime(2020, 1, 1, hour, minute).astimezone()
 
 
+class SimClock:
+    "Simulated monotonic and wall clocks"
+
+    def __init__(self, start: datetime):
+        self.wall = start
+        self.elapsed = 1000.0
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def now(self) -> datetime:
+        return self.wall
+
+    def advance(self, secs: float) -> None:
+        "Let time pass"
+        self.elapsed += secs
+        self.wall += timedelta(seconds=secs)
+
+    def step(self, secs: float) -> None:
+        "Adjust the wall clock only, like NTP or a DST change"
+        self.wall += timedelta(seconds=secs)
+
+
 class TasksTest(unittest.TestCase):
     sut: Tasks
 
@@ -20,12 +64,13 @@ class TasksTest(unittest.TestCase):
     tasks = (t1, t2, t3)  # sorted by time
 
     def setUp(self):
-        self.sut = Tasks(0.01)  # speed up for tests
+        self.sut = Tasks()
 
     def tearDown(self):
         self.sut.stop()
 
     def test_add(self):
+        self.sut.stop()  # Keep the worker from popping due tasks
         self.sut.add(self.t1)
         self.assertIn(self.t1, self.sut)
         self.assertEqual(1, len(self.sut))
@@ -39,6 +84,7 @@ class TasksTest(unittest.TestCase):
         self.assertEqual(2, len(self.sut))
 
     def test_repr(self):
+        self.sut.stop()  # Keep the worker from popping due tasks
         self.sut.addAll(self.tasks)
         lines = repr(self.sut).split("\n")
 
@@ -46,22 +92,40 @@ class TasksTest(unittest.TestCase):
         self.assertIn(str(self.t2.when), lines[2])
         self.assertIn(str(self.t3.when), lines[3])
 
-    @patch("tasks.now")
-    def test_next(self, clock):
-        self.sut.resolution = 0.1
-        time.sleep(0.015)
-        self.sut.addAll((self.t3, self.t1, self.t2))
+    def simulate(self, start: datetime) -> SimClock:
+        "Stop the worker and use a simulated clock"
+        self.sut.stop()  # Keep the worker from popping tasks
+        clock = SimClock(start)
+        self.sut.clock = clock.monotonic
+        return clock
+
+    def test_next(self):
+        clock = self.simulate(at(0))
+        with patch("tasks.now", clock.now):
+            self.sut.addAll((self.t3, self.t1, self.t2))
 
         for expected in self.tasks:
-            clock.return_value = expected.when
+            clock.advance((expected.when - clock.wall).total_seconds())
             task = self.sut.next()
 
             self.assertIsNotNone(task)
             self.assertEqual(expected, task)
             self.assertNotIn(task, self.sut)
-            self.sut.resolution = 0.01
+
+    def test_clock_step(self):
+        clock = self.simulate(at(0))
+        with patch("tasks.now", clock.now):
+            self.sut.create(print, at(0, 10), "t")
+
+        clock.step(3600)
+        self.assertIsNone(self.sut.next())
+        clock.advance(599)
+        self.assertIsNone(self.sut.next())
+        clock.advance(1)
+        self.assertEqual("t", self.sut.next().id)
 
     def test_cancel(self):
+        self.sut.stop()  # Keep the worker from popping due tasks
         self.sut.addAll(self.tasks)
         self.sut.cancel("t2")
         self.assertNotIn(self.t2, self.sut)
@@ -69,18 +133,658 @@ class TasksTest(unittest.TestCase):
         self.assertIn(self.t3, self.sut)
         self.assertEqual(2, len(self.sut))
 
-    @patch("tasks.now")
-    def test_run(self, clock):
-        output = []
-        t1 = Tasks.Task(at(0, 1), "t1", lambda: output.append("t1"))
-        t2 = Tasks.Task(at(0, 2), "t2", lambda: output.append("t2"))
-        t3 = Tasks.Task(at(0, 3), "t3", lambda: output.append("t3"))
+    def test_rearm(self):
+        self.sut.stop()
+        self.sut.addAll(self.tasks)
+        t0 = Tasks.Task(at(0), "t2", print)
+        self.sut.add(t0)
+        self.assertIn(t0, self.sut)
+        self.assertNotIn(self.t2, self.sut)
+        self.assertEqual(3, len(self.sut))
+        self.assertEqual([t0, self.t1, self.t3], [self.sut.next() for _t in range(3)])
+        self.assertIsNone(self.sut.next())
+
+    def test_compact(self):
+        self.sut.stop()
+        self.sut.addAll(self.tasks)
+        for n in range(1000):
+            self.sut.create(print, at(4), "x%d" % (n % 10))
+            self.sut.cancel("x%d" % (n % 7))
+        self.assertIn(self.t3, self.sut)
+        self.assertLessEqual(len(self.sut.queue.heap), 2 * len(self.sut) + 64)
+
+    def test_run(self):
+        self.sut.stop()
+        self.sut = Tasks(executor=Executor(workers=1))  # Run in order
+        output, done = [], threading.Event()
+
+        def task(n):
+            output.append("t%d" % n)
+            if n == 3:
+                done.set()
+
+        start = now()
+        t1, t2, t3 = (
+            Tasks.Task(start + timedelta(seconds=n / 100), "t%d" % n, partial(task, n))
+            for n in (1, 2, 3)
+        )
         self.sut.addAll((t2, t1, t3))
 
-        clock.return_value = t3.when
-        time.sleep((len(self.sut) + 1) * self.sut.resolution)
+        self.assertTrue(done.wait(1))
         self.assertEqual(["t1", "t2", "t3"], output)
 
+    def test_concurrent_access(self):
+        start = now()
+        for n in range(200):
+            when = start + timedelta(milliseconds=300 + n)
+            self.sut.create(lambda: None, when, "t%d" % n)
+
+        deadline = time.monotonic() + 2
+        while len(self.sut) and time.monotonic() < deadline:
+            self.assertLessEqual(len(list(self.sut)), 200)
+            self.assertIsInstance("t199" in self.sut, bool)
+            repr(self.sut)
+        self.assertEqual(0, len(self.sut))
+
+    def fire_at(self, when, id="t"):
+        "Schedule a task that records its start time"
+        fired = threading.Event()
+        fired.when = None
+
+        def func():
+            fired.when = now()
+            fired.set()
+
+        self.sut.create(func, when, id)
+        return fired
+
+    def assertPunctual(self, fired, when):
+        self.assertTrue(fired.wait(1))
+        lag = (fired.when - when).total_seconds()
+        self.assertGreaterEqual(lag, 0)
+        self.assertLess(lag, 0.02)
+
+    def test_punctual(self):
+        when = now() + timedelta(seconds=0.05)
+        self.assertPunctual(self.fire_at(when), when)
+
+    def test_wakeup_on_new_head(self):
+        self.fire_at(now() + timedelta(hours=1), "later")
+        time.sleep(0.02)  # worker is waiting for "later"
+
+        when = now() + timedelta(seconds=0.02)
+        self.assertPunctual(self.fire_at(when), when)
+
+    def test_wakeup_on_cancel(self):
+        first = self.fire_at(now() + timedelta(seconds=0.02), "first")
+        when = now() + timedelta(seconds=0.05)
+        second = self.fire_at(when, "second")
+        self.sut.cancel("first")
+
+        self.assertPunctual(second, when)
+        self.assertFalse(first.is_set())
+
+    def test_notify_on_cancel(self):
+        self.fire_at(now() + timedelta(hours=1), "later")
+        time.sleep(0.02)  # worker is waiting for "later"
+        self.sut.clock = clock = Mock(side_effect=time.monotonic)
+        self.sut.cancel("later")
+        time.sleep(0.02)
+        self.assertLess(0, clock.call_count)  # worker woke up
+
+    def test_idle(self):
+        self.fire_at(now() + timedelta(hours=1))
+        time.sleep(0.02)  # worker is waiting
+        self.sut.clock = clock = Mock(side_effect=time.monotonic)
+        time.sleep(0.2)
+        self.assertEqual(0, clock.call_count)
+
+
+class WheelTasksTest(TasksTest):
+    "Run the Tasks tests with a timing wheel"
+
+    def setUp(self):
+        self.sut = Tasks(queue=partial(TimingWheel, resolution=0.001))
+
+    @unittest.skip("No tombstones in a timing wheel")
+    def test_compact(self):
+        pass
+
+    def test_idle(self):
+        self.fire_at(now() + timedelta(hours=1))
+        time.sleep(0.02)  # worker is waiting
+        self.sut.clock = clock = Mock(side_effect=time.monotonic)
+        time.sleep(0.2)
+        self.assertLessEqual(clock.call_count, 2)  # at most one cascade
+
+
+class TimingWheelTest(unittest.TestCase):
+    start = 1_000_000.0
+
+    def setUp(self):
+        self.sut = TimingWheel(resolution=0.01)
+
+    def push(self, key, id):
+        return self.sut.push(key, Tasks.Task(None, id, print), self.start)
+
+    def test_levels(self):
+        delays = (0, 0.05, 0.5, 3, 100, 5_000, 300_000, 50_000_000)
+        for n, secs in enumerate(delays):
+            self.push(self.start + secs, "t%d" % n)
+        self.assertEqual(len(delays), len(self.sut))
+
+        for n, secs in enumerate(delays):
+            key = self.start + secs
+            self.assertLessEqual(self.sut.next_key(), key + self.sut.resolution)
+            self.assertIsNone(self.sut.pop_due(key - 2 * self.sut.resolution))
+            self.assertEqual("t%d" % n, self.sut.pop_due(key + self.sut.resolution).id)
+        self.assertEqual(0, len(self.sut))
+        self.assertIsNone(self.sut.next_key())
+
+    def test_order(self):
+        rnd = random.Random(42)
+        keys = {"t%d" % n: self.start + rnd.uniform(0, 1_000) for n in range(1000)}
+        for id, key in keys.items():
+            self.push(key, id)
+
+        fired = []
+        while (now := self.sut.next_key()) is not None:
+            while task := self.sut.pop_due(now):
+                self.assertGreaterEqual(now, keys[task.id])
+                self.assertLessEqual(now, keys[task.id] + self.sut.resolution)
+                fired.append(task.id)
+        self.assertEqual(sorted(keys, key=keys.__getitem__), fired)
+
+    def test_remove(self):
+        self.push(self.start + 1, "t1")
+        self.push(self.start + 1000, "t2")
+        self.assertIn("t1", self.sut)
+        self.assertEqual("t1", self.sut.remove("t1").id)
+        self.assertIsNone(self.sut.remove("t1"))
+        self.assertNotIn("t1", self.sut)
+        self.assertIsNone(self.sut.pop_due(self.start + 10))
+        self.assertEqual(["t2"], [t.id for t in self.sut])
+
+    def test_replace(self):
+        self.push(self.start + 1, "t1")
+        self.push(self.start + 2, "t1")
+        self.assertEqual(1, len(self.sut))
+        self.assertIsNone(self.sut.pop_due(self.start + 1.5))
+        self.assertEqual("t1", self.sut.pop_due(self.start + 2).id)
+
+    def test_wakeup(self):
+        self.push(self.start + 100, "t1")
+        self.sut.next_key()  # worker goes to sleep
+        self.assertFalse(self.push(self.start + 200, "t2"))
+        self.assertTrue(self.push(self.start + 1, "t3"))
+
+
+class AsyncTasksTest(unittest.TestCase):
+    def setUp(self):
+        self.sut = AsyncTasks()
+
+    def tearDown(self):
+        self.sut.stop()
+
+    def test_coroutine(self):
+        fired = threading.Event()
+
+        async def func():
+            await asyncio.sleep(0)
+            fired.when = now()
+            fired.thread = threading.current_thread()
+            fired.set()
+
+        when = now() + timedelta(seconds=0.05)
+        self.sut.create(func, when, "t")
+        self.assertIn("t", self.sut)
+        self.assertTrue(fired.wait(1))
+        self.assertNotIn("t", self.sut)
+        self.assertIs(self.sut.thread, fired.thread)
+        self.assertLess((fired.when - when).total_seconds(), 0.02)
+
+    def test_function(self):
+        fired = threading.Event()
+        self.sut.create(fired.set)
+        self.assertTrue(fired.wait(1))
+
+    def test_cancel(self):
+        fired = threading.Event()
+        self.sut.create(fired.set, now() + timedelta(seconds=0.02), "t")
+        self.sut.cancel("t")
+        self.assertEqual(0, len(self.sut))
+        self.assertFalse(fired.wait(0.05))
+
+    def test_replace(self):
+        output = []
+        self.sut.create(lambda: output.append(1), now() + timedelta(seconds=0.02), "t")
+        self.sut.create(lambda: output.append(2), now() + timedelta(seconds=0.03), "t")
+        self.assertEqual(1, len(self.sut))
+        time.sleep(0.1)
+        self.assertEqual([2], output)
+
+    def test_concurrency(self):
+        done = []
+        threads = threading.active_count()
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+            done.append(1)
+
+        for n in range(1000):
+            self.sut.create(wait, id="t%d" % n)
+        self.assertTrue(self.wait_for(lambda: len(self.sut.active) == 1000))
+        self.assertEqual(threads, threading.active_count())
+
+        self.sut.loop.call_soon_threadsafe(release.set)
+        self.assertTrue(self.wait_for(lambda: len(done) == 1000))
+
+    def test_overlap(self):
+        done = []
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+            done.append(1)
+
+        for overlap in (Executor.SKIP_IF_RUNNING, Executor.QUEUE_ONE):
+            for _n in range(3):
+                self.sut.create(wait, id=overlap, overlap=overlap)
+                time.sleep(0.01)
+        self.assertTrue(self.wait_for(lambda: len(self.sut.active) == 2))
+
+        self.sut.loop.call_soon_threadsafe(release.set)
+        self.assertTrue(self.wait_for(lambda: not self.sut.active))
+        self.assertEqual(3, len(done))  # Skipped two, coalesced two into one
+        self.assertEqual(2, self.sut.metrics[Executor.SKIP_IF_RUNNING].skipped)
+        self.assertEqual(1, self.sut.metrics[Executor.QUEUE_ONE].skipped)
+
+    def wait_for(self, condition, timeout=1):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return condition()
+
+
+class AsyncSchedulerTest(unittest.TestCase):
+    class Skill(AsyncScheduler):
+        log = logging.getLogger("AsyncSchedulerTest")
+
+        def __init__(self):
+            self.fired = threading.Event()
+
+        @delay(seconds=0)
+        async def later(self):
+            await asyncio.sleep(0)
+            self.fired.set()
+
+    def test_delay(self):
+        skill = self.Skill()
+        skill.tasks = skill.create_tasks()
+        try:
+            skill.later()
+            self.assertTrue(skill.fired.wait(1))
+        finally:
+            skill.tasks.stop()
+
+    def test_mqtt_client(self):
+        log = logging.getLogger("AsyncSchedulerTest")
+        for bases in ((MqttClient, AsyncScheduler), (AsyncScheduler, MqttClient)):
+            skill = type("Skill", bases, {"log": log})()
+            skill.tasks = skill.create_tasks()
+            fired = threading.Event()
+            try:
+                skill.tasks.create(fired.set)
+                self.assertTrue(fired.wait(1))
+                self.assertIs(skill.event_loop, skill.tasks.loop)
+                self.assertIs(MqttClient.loop, type(skill).loop)  # Not shadowed
+            finally:
+                skill.tasks.stop()
+
+
+class TaskStoreTest(unittest.TestCase):
+    class Skill(Scheduler):
+        log = logging.getLogger("TaskStoreTest")
+        runs = 0
+
+        def __init__(self):
+            super().__init__()
+            self.ran = threading.Condition()
+
+        @delay(minutes=5, overlap=Executor.SKIP_IF_RUNNING, timeout=30)
+        def reminder(self):
+            pass
+
+        @cron("0 * * * *", catch_up=Scheduler.ALL)
+        def hourly(self):
+            with self.ran:
+                self.runs += 1
+                self.ran.notify_all()
+
+        def wait_for_runs(self, count):
+            with self.ran:
+                self.ran.wait_for(lambda: self.runs >= count, timeout=5)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "tasks.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_store(self):
+        later = now() + timedelta(hours=1)
+        store = TaskStore(self.path, ("t1",))
+        sut = Tasks(store=store)
+        sut.create(print, later, "t1")
+        sut.create(print, later, "t2")  # not restorable
+        sut.stop()
+        store.close()
+
+        store = TaskStore(self.path, ("t1",))
+        self.assertEqual(store.pending(), [("t1", later)])
+        store.delete("t1")
+        self.assertEqual(store.pending(), [])
+        store.close()
+
+    def test_restore(self):
+        store = TaskStore(self.path, Scheduler.persistent_tasks)
+        store.save(Tasks.Task(now() + timedelta(minutes=1), "delayed_reminder", print))
+        store.set_last_run("hourly", now() - timedelta(hours=3))
+        store.close()
+
+        skill = self.Skill()
+        skill.tasks = skill.create_tasks()
+        skill.task_store = TaskStore(self.path, Scheduler.persistent_tasks)
+        try:
+            skill.restore_tasks()
+            (task,) = (t for t in skill.tasks if t.id == "delayed_reminder")
+            self.assertEqual(Executor.SKIP_IF_RUNNING, task.overlap)
+            self.assertEqual(30, task.timeout)
+            skill.tasks.cancel("delayed_reminder")
+            self.assertEqual(skill.task_store.pending(), [])
+
+            skill.wait_for_runs(3)
+            self.assertEqual(skill.runs, 3)
+        finally:
+            skill.tasks.stop()
+            skill.task_store.close()
+
+    def test_stalled_catch_up(self):
+        store = TaskStore(self.path, Scheduler.persistent_tasks)
+        store.set_last_run("hourly", now() - timedelta(hours=3))
+        store.close()
+
+        skill = self.Skill()
+        skill.tasks = skill.create_tasks()
+        skill.task_store = TaskStore(self.path, Scheduler.persistent_tasks)
+        stuck = now() - timedelta(hours=2)
+        try:
+            with (
+                patch.object(skill, "cron_time", return_value=stuck),
+                self.assertLogs("TaskStoreTest", logging.WARNING),
+            ):
+                skill.restore_tasks()
+
+            skill.wait_for_runs(1)
+            self.assertEqual(skill.runs, 1)
+        finally:
+            skill.tasks.stop()
+            skill.task_store.close()
+
+
+class CronScheduleTest(unittest.TestCase):
+    schedules = (
+        "* * * * *",
+        "*/5 * * * *",
+        "30 4 * * *",
+        "0 9-17 * * 1-5",
+        "15 0 1,15 * *",
+        "0 12 13 * 5",  # day of month or Friday
+        "0 0 29 2 *",
+        "0 0 * * 7",
+        "0 0 L * *",  # croniter fallback
+    )
+
+    def test_next(self):
+        start, rnd = at(0), random.Random(7)
+        for expr in self.schedules:
+            sut = CronSchedule(expr)
+            when = start + timedelta(seconds=rnd.randint(0, 10**8))
+            expected = croniter(expr, when).get_next(datetime)
+            self.assertEqual(sut.next(when), expected, expr)
+
+    def test_dst(self):
+        tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Berlin"
+        time.tzset()
+        self.addCleanup(self.restore_tz, tz)
+
+        cet, cest = timezone(timedelta(hours=1)), timezone(timedelta(hours=2))
+        cases = (
+            # Spring forward: 02:00-03:00 does not exist
+            ("30 2 * * *", (2020, 3, 29, 1, 45, cet), (2020, 3, 30, 2, 30, cest)),
+            ("*/15 * * * *", (2020, 3, 29, 1, 50, cet), (2020, 3, 29, 3, 0, cest)),
+            # Fall back: 02:00-03:00 happens twice
+            ("30 2 * * *", (2020, 10, 25, 1, 0, cest), (2020, 10, 25, 2, 30, cest)),
+            ("*/30 * * * *", (2020, 10, 25, 2, 40, cest), (2020, 10, 25, 3, 0, cet)),
+            ("*/15 * * * *", (2020, 10, 25, 2, 10, cet), (2020, 10, 25, 3, 0, cet)),
+            ("30 2 * * *", (2020, 10, 25, 2, 40, cet), (2020, 10, 26, 2, 30, cet)),
+        )
+        for expr, after, expected in cases:
+            after = datetime(*after[:5], tzinfo=after[5])
+            expected = datetime(*expected[:5], tzinfo=expected[5])
+            result = CronSchedule(expr).next(after)
+            self.assertGreater(result, after, expr)
+            self.assertEqual(result, expected, expr)
+
+    @staticmethod
+    def restore_tz(tz):
+        if tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = tz
+        time.tzset()
+
+    def test_jitter(self):
+        class Skill(Scheduler):
+            _client_id = b"snips-skill-1234"  # Differs between processes
+
+            @cron("*/5 * * * *", jitter=60)
+            def often(self):
+                pass
+
+        skill = Skill()
+        offset = skill.cron_jitter("often", 60)
+        self.assertEqual(offset, skill.cron_jitter("often", 60))
+        self.assertLessEqual(offset, 60)
+
+        skill._client_id = b"snips-skill-5678"
+        self.assertEqual(offset, skill.cron_jitter("often", 60))
+
+        offsets = set()
+        for client_id in ("a", "b", "c", "d"):
+            skill.configured_client_id = client_id
+            offsets.add(skill.cron_jitter("often", 60))
+        self.assertLess(1, len(offsets))  # Instances with distinct IDs spread out
+        skill.configured_client_id = None
+
+        when = skill.cron_time("often", at(1))
+        self.assertEqual(when, at(1) + timedelta(seconds=offset))
+        self.assertEqual(skill.cron_time("often", when), when + timedelta(minutes=5))
+
+
+class ExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.active = {}
+        self.peak = {}
+        self.mutex = threading.Lock()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.sut.shutdown()
+
+    def task(self, id, group=None, **kw):
+        "A task that waits for self.release and tracks concurrency per group"
+        group = group or id
+
+        def func():
+            with self.mutex:
+                self.active[group] = self.active.get(group, 0) + 1
+                self.peak[group] = max(self.peak.get(group, 0), self.active[group])
+            self.release.wait(1)
+            with self.mutex:
+                self.active[group] -= 1
+
+        return Tasks.Task(now(), id, func, **kw)
+
+    def wait_idle(self):
+        deadline = time.monotonic() + 1
+        while (self.sut.busy or self.sut.queue.qsize()) and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_pool_size(self):
+        self.sut = Executor(workers=2)
+        for n in range(4):
+            self.sut.submit(self.task("t%d" % n, "all"))
+        time.sleep(0.05)
+        self.assertEqual(2, self.sut.busy)
+        self.assertEqual(2, self.sut.queue.qsize())
+
+        self.release.set()
+        self.wait_idle()
+        self.assertEqual(2, self.peak["all"])
+        self.assertEqual(4, self.sut.executed)
+
+    def test_serialization(self):
+        self.sut = Executor(workers=4)
+        for _n in range(3):
+            self.sut.submit(self.task("t"))
+        time.sleep(0.05)
+        self.assertEqual(1, self.sut.busy)
+
+        self.release.set()
+        self.wait_idle()
+        self.assertEqual(1, self.peak["t"])
+        self.assertEqual(2, self.sut.executed)  # The last two were coalesced
+        self.assertEqual(1, self.sut.metrics["t"].skipped)
+
+    def test_skip_if_running(self):
+        self.sut = Executor(workers=4)
+        for _n in range(3):
+            self.sut.submit(self.task("t", overlap=Executor.SKIP_IF_RUNNING))
+        time.sleep(0.05)
+
+        self.release.set()
+        self.wait_idle()
+        self.assertEqual(1, self.sut.executed)
+        self.assertEqual(2, self.sut.metrics["t"].skipped)
+
+    def test_allow_overlap(self):
+        self.sut = Executor(workers=4)
+        for _n in range(3):
+            self.sut.submit(self.task("t", overlap=Executor.ALLOW_OVERLAP))
+        time.sleep(0.05)
+        self.assertEqual(3, self.sut.busy)
+
+        self.release.set()
+        self.wait_idle()
+        self.assertEqual(3, self.peak["t"])
+        self.assertEqual(3, self.sut.executed)
+
+    def test_timeout(self):
+        self.sut = Executor(workers=1)
+        with self.assertLogs("Executor", logging.WARNING):
+            self.sut.submit(self.task("t", timeout=0.01))
+            time.sleep(0.05)
+        self.assertEqual(1, self.sut.metrics["t"].hung)
+        self.assertEqual(["t"], self.sut.metrics.running)
+
+    def test_watchdog(self):
+        self.sut = Executor(workers=1)
+        with (
+            patch.object(threading, "Thread", wraps=threading.Thread) as thread,
+            self.assertLogs("Executor", logging.WARNING) as logs,
+        ):
+            self.sut.submit(self.task("slow", timeout=0.01))
+            for n in range(10):  # finish in time
+                fast = Tasks.Task(now(), "fast", lambda: None, timeout=0.02)
+                self.sut.execute(fast, time.monotonic())
+            time.sleep(0.05)
+        self.assertEqual(1, len(logs.records))
+        self.assertEqual(1, self.sut.metrics["slow"].hung)
+        self.assertEqual(0, self.sut.metrics["fast"].hung)
+        thread.assert_called_once()  # the watchdog
+
+        watchdog = self.sut.watchdog
+        self.release.set()
+        self.sut.shutdown()
+        watchdog.join(1)
+        self.assertFalse(watchdog.is_alive())
+
+    def test_discard(self):
+        self.sut = Executor(workers=1, queue_size=1, overflow=Executor.DISCARD)
+        for n in range(3):
+            self.sut.submit(self.task("t%d" % n))
+            time.sleep(0.01)  # let the worker pick up t0
+        self.assertEqual(1, self.sut.discarded)
+
+        self.release.set()
+        self.wait_idle()
+        self.assertEqual(2, self.sut.executed)
+        self.assertNotIn("t2", self.peak)
+
+    def test_coroutine(self):
+        self.sut = Executor(workers=1)
+        self.sut.submit(Tasks.Task(now(), "t", self.async_release))
+        self.assertTrue(self.release.wait(1))
+
+    async def async_release(self):
+        await asyncio.sleep(0)
+        self.release.set()
+
+    def test_caller_runs(self):
+        self.sut = Executor(workers=1, queue_size=1, overflow=Executor.CALLER_RUNS)
+        output = []
+        self.sut.submit(Tasks.Task(now(), "t0", lambda: self.release.wait(1)))
+        time.sleep(0.01)
+        self.sut.submit(Tasks.Task(now(), "t1", print))
+        self.sut.submit(Tasks.Task(now(), "t2", lambda: output.append("t2")))
+        self.assertEqual(["t2"], output)  # ran synchronously
+
+    def test_repr(self):
+        self.sut = Executor(workers=2, queue_size=8)
+        self.assertIn("0/2 busy, queue: 0/8", repr(self.sut))
+
+    def test_metrics(self):
+        self.sut = Executor()
+
+        def fail():
+            raise ValueError("Failed")
+
+        with self.assertLogs("Executor", logging.ERROR):
+            self.sut.execute(Tasks.Task(now(), "fail", fail), time.monotonic())
+        late = Tasks.Task(now() - timedelta(seconds=2), "late", lambda: None)
+        self.sut.execute(late, time.monotonic())
+
+        metrics = self.sut.metrics
+        self.assertEqual(list(metrics), ["fail", "late"])
+        self.assertEqual(metrics["fail"].failures, 1)
+        self.assertEqual(metrics["late"].count, 1)
+        self.assertEqual(metrics["late"].failures, 0)
+        self.assertEqual(metrics["late"].lag.counts[4], 1)  # 1-10s
+        self.assertGreaterEqual(metrics["late"].lag.max, 2)
+        self.assertEqual(metrics.running, [])
+        self.assertIn("late: 1 runs, 0 failed", repr(metrics))
+
+    def test_lag_on_deadline(self):
+        self.sut = Executor()
+        task = Tasks.Task(now(), "t", lambda: None)  # on time by the wall clock
+        self.sut.execute(task, time.monotonic(), time.monotonic() - 2)
+        self.assertGreaterEqual(self.sut.metrics["t"].lag.max, 2)
+
 
 if __name__ == "__main__":
     unittest.main()